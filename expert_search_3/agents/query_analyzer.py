@@ -1,69 +1,208 @@
-from typing import Dict, Any, List, Tuple
-from models.schemas import QueryType, SearchQuery, ReasoningTrace
+from typing import Dict, Any, List, Tuple, Optional
+from models.schemas import QueryType, SearchQuery, SearchFilters, ReasoningTrace
 from tools.llm_tools import LLMClient
+from config.settings import QUERY_ANALYSIS_MODE, QUERY_ANALYSIS_CALL_TIMEOUT
+from utils import metrics
+import asyncio
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
 class QueryAnalyzer:
-    def __init__(self):
-        self.llm_client = LLMClient()
+    def __init__(self, llm_client: Optional[LLMClient] = None, mode: str = QUERY_ANALYSIS_MODE,
+                 call_timeout: float = QUERY_ANALYSIS_CALL_TIMEOUT):
+        self.llm_client = llm_client or LLMClient()
+        # "combined" = one JSON-mode call, "separate" = three reasoning calls
+        self.mode = mode
+        self.call_timeout = call_timeout
     
     async def analyze(self, query: str) -> SearchQuery:
         """Original analyze method"""
-        analysis = await self.llm_client.analyze_query(query)
+        if self.mode == "combined":
+            analysis, _ = await self.llm_client.analyze_query_combined(query)
+            enhanced_queries = analysis["enhanced_queries"]
+            keywords = analysis["keywords"]
+        else:
+            analysis, enhanced_queries, keywords = await asyncio.gather(
+                self.llm_client.analyze_query(query),
+                self.llm_client.enhance_query(query),
+                self.llm_client.extract_keywords(query)
+            )
         
         query_type = QueryType.PROJECT_BASED if analysis.get("query_type") == "project_based" else QueryType.DIRECT_EXPERT
         
-        enhanced_queries = await self.llm_client.enhance_query(query)
-        keywords = await self.llm_client.extract_keywords(query)
-        
         return SearchQuery(
             original_query=query,
             query_type=query_type,
             enhanced_queries=enhanced_queries,
-            keywords=keywords
+            keywords=keywords,
+            filters=self._extract_filters(analysis)
+        )
+    
+    def _extract_filters(self, analysis: Dict[str, Any]) -> SearchFilters:
+        """Collect geography/experience/function constraints from the analysis,
+        which may put them at the top level or under either strategy"""
+        project_strategy = analysis.get("project_based_strategy")
+        if not isinstance(project_strategy, dict):
+            project_strategy = {}
+        sections = [
+            analysis,
+            analysis.get("direct_expert_strategy"),
+            project_strategy.get("required_expert_profile")
+        ]
+        
+        geographies, functions = [], []
+        min_years = None
+        for section in sections:
+            if not isinstance(section, dict):
+                continue
+            geographies.extend(self._as_list(section.get("geographical_focus")))
+            functions.extend(self._as_list(section.get("functions")))
+            if min_years is None:
+                min_years = self._parse_years(section.get("experience_level"))
+        
+        return SearchFilters(
+            geographies=list(dict.fromkeys(geographies)),
+            min_years_of_experience=min_years,
+            functions=list(dict.fromkeys(functions))
+        )
+    
+    @staticmethod
+    def _as_list(value: Any) -> List[str]:
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, list):
+            return []
+        return [str(v).strip() for v in value if v and str(v).strip()]
+    
+    @staticmethod
+    def _parse_years(value: Any) -> Optional[int]:
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, (int, float)):
+            return int(value) if value > 0 else None
+        if isinstance(value, str):
+            match = re.search(r'\d+', value)
+            if match:
+                return int(match.group())
+        return None
+    
+    async def _analyze_combined(self, query: str, reasoning_traces: List[ReasoningTrace]
+                                ) -> Tuple[Dict[str, Any], List[str], List[str]]:
+        """One structured LLM call for type, constraints, variations and keywords"""
+        analysis, reasoning = await self.llm_client.analyze_query_combined(query)
+        enhanced_queries = analysis["enhanced_queries"]
+        keywords = analysis["keywords"]
+        
+        reasoning_traces.append(ReasoningTrace(
+            step="Query Analysis",
+            reasoning=reasoning,
+            decision=analysis["query_type"],
+            confidence=0.8
+        ))
+        reasoning_traces.append(ReasoningTrace(
+            step="Query Enhancement",
+            reasoning="Variations produced by the combined analysis call",
+            decision=f"Generated {len(enhanced_queries)} query variations",
+            confidence=0.9
+        ))
+        reasoning_traces.append(ReasoningTrace(
+            step="Keyword Extraction",
+            reasoning="Keywords produced by the combined analysis call",
+            decision=f"Extracted {len(keywords)} keywords",
+            confidence=0.85
+        ))
+        return analysis, enhanced_queries, keywords
+    
+    async def _call_with_fallback(self, step: str, call, fallback: Any) -> Tuple[Any, str, bool]:
+        """Await one (result, reasoning) LLM call under the per-call timeout;
+        on timeout or error return the heuristic fallback instead"""
+        try:
+            result, reasoning = await asyncio.wait_for(call, timeout=self.call_timeout)
+            return result, reasoning, True
+        except asyncio.TimeoutError:
+            logger.warning(f"{step} timed out after {self.call_timeout}s, using fallback")
+            metrics.increment("llm_call_fallback", step=step, reason="timeout")
+            return fallback, f"LLM call timed out after {self.call_timeout}s; using heuristic fallback", False
+        except Exception as e:
+            logger.error(f"Error in {step}: {e}")
+            metrics.increment("llm_call_fallback", step=step, reason="error")
+            return fallback, f"LLM call failed ({e}); using heuristic fallback", False
+    
+    async def _analyze_separate(self, query: str, reasoning_traces: List[ReasoningTrace]
+                                ) -> Tuple[Dict[str, Any], List[str], List[str]]:
+        """Analysis, enhancement and keyword extraction as three concurrent
+        reasoning calls; none depends on another's output, so a slow call only
+        degrades its own result"""
+        analysis_result, enhance_result, keyword_result = await asyncio.gather(
+            self._call_with_fallback(
+                "Query Analysis",
+                self.llm_client.analyze_query_with_reasoning(query),
+                {"query_type": LLMClient._guess_query_type(query)}
+            ),
+            self._call_with_fallback(
+                "Query Enhancement",
+                self.llm_client.enhance_query_with_reasoning(query),
+                LLMClient._default_query_variations(query)
+            ),
+            self._call_with_fallback(
+                "Keyword Extraction",
+                self.llm_client.extract_keywords_with_reasoning(query),
+                LLMClient._basic_keywords(query)
+            )
         )
+        analysis, analysis_reasoning, analysis_ok = analysis_result
+        enhanced_queries, enhance_reasoning, enhance_ok = enhance_result
+        keywords, keyword_reasoning, keywords_ok = keyword_result
+        
+        reasoning_traces.append(ReasoningTrace(
+            step="Query Analysis",
+            reasoning=analysis_reasoning,
+            decision=analysis.get("query_type", "direct_expert"),
+            confidence=0.8 if analysis_ok else 0.5
+        ))
+        reasoning_traces.append(ReasoningTrace(
+            step="Query Enhancement",
+            reasoning=enhance_reasoning,
+            decision=f"Generated {len(enhanced_queries)} query variations",
+            confidence=0.9 if enhance_ok else 0.5
+        ))
+        reasoning_traces.append(ReasoningTrace(
+            step="Keyword Extraction",
+            reasoning=keyword_reasoning,
+            decision=f"Extracted {len(keywords)} keywords",
+            confidence=0.85 if keywords_ok else 0.5
+        ))
+        return analysis, enhanced_queries, keywords
     
     async def analyze_with_reasoning(self, query: str) -> Tuple[SearchQuery, List[ReasoningTrace]]:
         """Analyze query and return reasoning traces"""
         reasoning_traces = []
         
         try:
-            analysis, analysis_reasoning = await self.llm_client.analyze_query_with_reasoning(query)
-            
-            reasoning_traces.append(ReasoningTrace(
-                step="Query Analysis",
-                reasoning=analysis_reasoning,
-                decision=analysis.get("query_type", "direct_expert"),
-                confidence=0.8
-            ))
+            if self.mode == "combined":
+                analysis, enhanced_queries, keywords = await self._analyze_combined(query, reasoning_traces)
+            else:
+                analysis, enhanced_queries, keywords = await self._analyze_separate(query, reasoning_traces)
             
             query_type = QueryType.PROJECT_BASED if analysis.get("query_type") == "project_based" else QueryType.DIRECT_EXPERT
             
-            enhanced_queries, enhance_reasoning = await self.llm_client.enhance_query_with_reasoning(query)
-            
-            reasoning_traces.append(ReasoningTrace(
-                step="Query Enhancement",
-                reasoning=enhance_reasoning,
-                decision=f"Generated {len(enhanced_queries)} query variations",
-                confidence=0.9
-            ))
-            
-            keywords, keyword_reasoning = await self.llm_client.extract_keywords_with_reasoning(query)
-            
-            reasoning_traces.append(ReasoningTrace(
-                step="Keyword Extraction",
-                reasoning=keyword_reasoning,
-                decision=f"Extracted {len(keywords)} keywords",
-                confidence=0.85
-            ))
+            filters = self._extract_filters(analysis)
+            if not filters.is_empty():
+                reasoning_traces.append(ReasoningTrace(
+                    step="Constraint Extraction",
+                    reasoning=f"Constraints found in analysis: {filters.model_dump(exclude_defaults=True)}",
+                    decision="Apply as search filters",
+                    confidence=0.7
+                ))
             
             search_query = SearchQuery(
                 original_query=query,
                 query_type=query_type,
                 enhanced_queries=enhanced_queries,
                 keywords=keywords,
+                filters=filters,
                 reasoning=reasoning_traces[0]
             )
             
@@ -1,13 +1,22 @@
-from typing import List, Tuple
+from typing import List, Tuple, Optional
 from models.schemas import Expert, SearchQuery
 from tools.llm_tools import LLMClient
+from tools.rerank_tools import CrossEncoderScorer, get_cross_encoder
+from config.settings import RERANKER_BACKEND, RERANK_CANDIDATES, RERANK_LLM_FINAL_STAGE, RERANK_LLM_TOP_N
+import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 class Reranker:
-    def __init__(self):
-        self.llm_client = LLMClient()
+    def __init__(self, llm_client: Optional[LLMClient] = None, backend: str = RERANKER_BACKEND,
+                 llm_final_stage: bool = RERANK_LLM_FINAL_STAGE):
+        self.llm_client = llm_client or LLMClient()
+        self.backend = backend
+        self.candidates = RERANK_CANDIDATES
+        self.llm_final_stage = llm_final_stage
+        self.llm_top_n = RERANK_LLM_TOP_N
     
     async def rerank_experts(self, experts: List[Expert], 
                            search_query: SearchQuery) -> List[Expert]:
@@ -60,6 +69,37 @@ class Reranker:
         
         return reranked_experts if reranked_experts else experts
     
+    @staticmethod
+    def _expert_text(expert: Expert) -> str:
+        """Headline, functions, geographies, experience and bio as one passage;
+        the cross-encoder truncates it to RERANKER_MAX_LENGTH tokens"""
+        parts = [expert.headline or ""]
+        if expert.functions:
+            parts.append("Functions: " + ", ".join(expert.functions))
+        if expert.expertise_in_these_geographies:
+            parts.append("Geographies: " + ", ".join(expert.expertise_in_these_geographies))
+        if expert.total_years_of_experience:
+            parts.append(f"{expert.total_years_of_experience} years of experience")
+        parts.append(expert.bio or "")
+        return ". ".join(p for p in parts if p)
+    
+    async def _cross_encoder_rerank(self, experts: List[Expert], search_query: SearchQuery,
+                                    scorer: CrossEncoderScorer) -> Tuple[List[Expert], str]:
+        """Order the top RERANK_CANDIDATES experts (by retrieval score) by cross-encoder score"""
+        experts = sorted(experts, key=lambda e: e.score or 0.0, reverse=True)
+        candidates = experts[:self.candidates]
+        start = time.perf_counter()
+        # CPU-bound; keep the event loop free for concurrent sessions
+        scores = await asyncio.to_thread(
+            scorer.score, search_query.original_query, [self._expert_text(e) for e in candidates]
+        )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        ranked = [e for _, e in sorted(zip(scores, candidates), key=lambda x: x[0], reverse=True)]
+        reasoning = (f"Cross-encoder ({scorer.model_name}) scored {len(candidates)} experts "
+                     f"against the query in {elapsed_ms:.0f}ms")
+        return ranked + experts[self.candidates:], reasoning
+    
     async def rerank_with_reasoning(self, experts: List[Expert], 
                                    search_query: SearchQuery) -> Tuple[List[Expert], str]:
         """Rerank experts with reasoning"""
@@ -80,6 +120,26 @@ class Reranker:
         if not valid_experts:
             return experts, "No valid expert data for reranking"
         
+        scorer = await get_cross_encoder() if self.backend == "cross_encoder" else None
+        if scorer is None:
+            return await self._llm_rerank(valid_experts, search_query)
+        
+        try:
+            reranked, reasoning = await self._cross_encoder_rerank(valid_experts, search_query, scorer)
+        except Exception as e:
+            logger.error(f"Cross-encoder reranking error: {e}")
+            return await self._llm_rerank(valid_experts, search_query)
+        
+        if self.llm_final_stage:
+            head, llm_reasoning = await self._llm_rerank(reranked[:self.llm_top_n], search_query)
+            reranked = head + reranked[self.llm_top_n:]
+            reasoning += f"\nLLM final stage on top {self.llm_top_n}: {llm_reasoning}"
+        
+        return reranked, reasoning
+    
+    async def _llm_rerank(self, valid_experts: List[Expert], 
+                          search_query: SearchQuery) -> Tuple[List[Expert], str]:
+        """Remote LLM ranking of the top 10 experts"""
         # Prepare data for LLM
         expert_dicts = []
         for i, expert in enumerate(valid_experts[:10]):  # Limit to top 10
@@ -97,7 +157,7 @@ class Reranker:
                 continue
         
         if not expert_dicts:
-            return experts, "Could not process experts for reranking"
+            return valid_experts, "Could not process experts for reranking"
         
         try:
             # Get reranked results from LLM
@@ -118,23 +178,17 @@ class Reranker:
                         if expert_id in id_to_expert:
                             reranked_experts.append(id_to_expert[expert_id])
             
-            # Add any remaining experts
+            # Add any remaining experts (including those beyond the top 10)
             reranked_ids = {e.id for e in reranked_experts}
             for expert in valid_experts:
                 if expert.id not in reranked_ids:
                     reranked_experts.append(expert)
             
-            # Add experts beyond top 10 if any
-            if len(experts) > 10:
-                for expert in experts[10:]:
-                    if expert.id not in reranked_ids:
-                        reranked_experts.append(expert)
-            
             if reranked_experts:
                 return reranked_experts, reasoning
             else:
-                return experts, f"Reranking incomplete, using original order. Reason: {reasoning}"
+                return valid_experts, f"Reranking incomplete, using original order. Reason: {reasoning}"
                 
         except Exception as e:
             logger.error(f"Reranking error: {e}")
-            return experts, f"Reranking failed: {str(e)}"
+            return valid_experts, f"Reranking failed: {str(e)}"
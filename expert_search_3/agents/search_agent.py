@@ -1,45 +1,155 @@
-from typing import List, Dict, Any, Tuple
-from models.schemas import SearchQuery, Expert, Project, QueryType
+import re
+from typing import List, Dict, Any, Tuple, Optional, Callable, Awaitable
+from models.schemas import SearchQuery, SearchFilters, Expert, Project, QueryType
 from tools.elasticsearch_tools import ElasticsearchClient
 from tools.embedding_tools import EmbeddingGenerator
 from tools.llm_tools import LLMClient
-from config.settings import EXPERT_INDEX, PROJECT_INDEX
+from tools import es_profiling
+from config.settings import (
+    EXPERT_INDEX, PROJECT_INDEX, EXPERT_SOURCE_FIELDS, PROJECT_SOURCE_FIELDS, EXPERT_STATUS_FILTER,
+    PROJECT_EXPERT_LIMIT, EXPERT_CACHE_SIZE, EXPERT_CACHE_TTL, FILTER_RELAX_MIN_RESULTS
+)
+from utils import metrics
+from utils.cache import LRUCache
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Shared by every SearchAgent in the process, so sessions and strategies
+# reuse each other's expert documents
+_expert_cache = LRUCache(EXPERT_CACHE_SIZE, EXPERT_CACHE_TTL)
+
 class SearchAgent:
-    def __init__(self):
+    def __init__(self, llm_client: Optional[LLMClient] = None):
         self.es_client = ElasticsearchClient()
         self.embedding_gen = EmbeddingGenerator()
-        self.llm_client = LLMClient()
+        self.llm_client = llm_client or LLMClient()
+    
+    @staticmethod
+    def _filter_value(value: str) -> str:
+        """Free-text constraint as the index's clean_normalizer stores keywords:
+        lowercase, punctuation removed, single spaces"""
+        return " ".join(re.sub(r'[^\w\s]', '', str(value).lower()).split())
+    
+    @classmethod
+    def _expert_filters(cls, filters: SearchFilters) -> List[Dict]:
+        """Elasticsearch filter clauses for the expert index.
+        
+        Assumes the mapping of expert_data/create_index.py: `status`,
+        `base_location` and `expertise_in_these_geographies` are keyword fields
+        with the lowercasing, punctuation-stripping `clean_normalizer`;
+        `functions` is analysed text; `total_years_of_experience` is an integer.
+        """
+        clauses = []
+        if EXPERT_STATUS_FILTER:
+            clauses.append({"terms": {"status": EXPERT_STATUS_FILTER}})
+        
+        geographies = list(dict.fromkeys(filter(None, map(cls._filter_value, filters.geographies))))
+        if geographies:
+            # Covering a region or being based there both count; base_location
+            # holds e.g. "berlin germany", so it matches on a contained name
+            clauses.append({
+                "bool": {
+                    "should": [
+                        {"terms": {"expertise_in_these_geographies": geographies}},
+                        *({"wildcard": {"base_location": {"value": f"*{g}*"}}} for g in geographies)
+                    ],
+                    "minimum_should_match": 1
+                }
+            })
+        if filters.min_years_of_experience:
+            clauses.append({"range": {"total_years_of_experience": {"gte": filters.min_years_of_experience}}})
+        
+        functions = list(dict.fromkeys(filter(None, map(cls._filter_value, filters.functions))))
+        if functions:
+            # Analysed match, so word order and wording around the function name do not matter
+            clauses.append({
+                "bool": {
+                    "should": [{"match": {"functions": {"query": f, "operator": "and"}}} for f in functions],
+                    "minimum_should_match": 1
+                }
+            })
+        return clauses
+    
+    async def _search_relaxing_filters(self, filters: SearchFilters,
+                                       search: Callable[[List[Dict]], Awaitable[List]],
+                                       expert_id: Callable[[Any], int]) -> List:
+        """`search(filter_clauses)` with the query constraints. When that finds
+        fewer than FILTER_RELAX_MIN_RESULTS distinct experts, the results are
+        topped up from the same search without them (constraints come from the
+        LLM and may be too strict for the index)."""
+        results = await search(self._expert_filters(filters))
+        if filters.is_empty():
+            return results
+        matched = {expert_id(r) for r in results}
+        if len(matched) >= FILTER_RELAX_MIN_RESULTS:
+            return results
+        logger.info(f"{len(matched)} experts match filters {filters}, adding matches without them")
+        metrics.increment("filter_relaxed")
+        relaxed = await search(self._expert_filters(SearchFilters()))
+        return results + [r for r in relaxed if expert_id(r) not in matched]
+    
+    @staticmethod
+    def _expert_from_source(source: Dict[str, Any], score: float) -> Expert:
+        return Expert(
+            id=source["id"],
+            bio=source.get("bio", ""),
+            headline=source.get("headline", ""),
+            base_location=source.get("base_location"),
+            expertise_in_these_geographies=source.get("expertise_in_these_geographies", []),
+            functions=source.get("functions", []),
+            total_years_of_experience=source.get("total_years_of_experience"),
+            work_experiences=source.get("work_experiences", []),
+            score=score
+        )
+    
+    async def get_experts(self, ids: List[int]) -> List[Expert]:
+        """Experts for `ids` in the given order (score 0), fetching only cache misses"""
+        _expert_cache.set_version(await self.es_client.index_version(EXPERT_INDEX))
+        found = _expert_cache.get_many(ids)
+        
+        missing = [expert_id for expert_id in ids if expert_id not in found]
+        if missing:
+            results = await self.es_client.get_by_ids(
+                EXPERT_INDEX, missing, source_includes=EXPERT_SOURCE_FIELDS
+            )
+            for result in results:
+                expert = self._expert_from_source(result["_source"], 0.0)
+                _expert_cache.put(expert.id, expert)
+                found[expert.id] = expert
+        
+        return [found[expert_id].model_copy() for expert_id in ids if expert_id in found]
     
     async def search_direct_experts(self, search_query: SearchQuery) -> List[Expert]:
         """Direct expert search based on description"""
-        all_results = []
+        queries = [search_query.original_query] + search_query.enhanced_queries
+        query_embeddings = self.embedding_gen.generate_embeddings(queries)
         
-        for query in [search_query.original_query] + search_query.enhanced_queries:
-            query_embedding = self.embedding_gen.generate_embedding(query)
-            
-            embedding_fields = [
-                "combined_embedding",
-                "bio_embedding",
-                "headline_embedding",
-                "profile_embedding"
-            ]
-            
-            text_fields = ["bio", "headline", "functions", "expertise_in_these_geographies"]
-            
-            for embed_field in embedding_fields:
-                results = self.es_client.hybrid_search(
-                    index=EXPERT_INDEX,
-                    embedding_field=embed_field,
-                    query_embedding=query_embedding,
-                    text_fields=text_fields,
-                    keywords=search_query.keywords,
-                    size=20
-                )
-                all_results.extend(results)
+        embedding_fields = [
+            "combined_embedding",
+            "bio_embedding",
+            "headline_embedding",
+            "profile_embedding"
+        ]
+        
+        text_fields = ["bio", "headline", "functions", "expertise_in_these_geographies"]
+        
+        # Every query variant x embedding field in one _msearch round-trip,
+        # with the analysed constraints applied to both BM25 and kNN
+        all_results = await self._search_relaxing_filters(
+            search_query.filters,
+            lambda filter: self.es_client.multi_hybrid_search(
+                index=EXPERT_INDEX,
+                embedding_fields=embedding_fields,
+                query_embeddings=query_embeddings,
+                text_fields=text_fields,
+                keywords=search_query.keywords,
+                size=20,
+                source_includes=EXPERT_SOURCE_FIELDS,
+                filter=filter
+            ),
+            lambda hit: hit["_source"]["id"]
+        )
         
         experts_dict = {}
         for result in all_results:
@@ -47,109 +157,77 @@ class SearchAgent:
             expert_id = source["id"]
             
             if expert_id not in experts_dict:
-                experts_dict[expert_id] = Expert(
-                    id=expert_id,
-                    bio=source.get("bio", ""),
-                    headline=source.get("headline", ""),
-                    base_location=source.get("base_location"),
-                    expertise_in_these_geographies=source.get("expertise_in_these_geographies", []),
-                    functions=source.get("functions", []),
-                    total_years_of_experience=source.get("total_years_of_experience"),
-                    work_experiences=source.get("work_experiences", []),
-                    score=result["_score"]
-                )
+                experts_dict[expert_id] = self._expert_from_source(source, result["_score"])
             else:
                 experts_dict[expert_id].score = max(
                     experts_dict[expert_id].score,
                     result["_score"]
                 )
         
+        # Search hits carry the same fields as a fetch, so later hydration is free
+        _expert_cache.set_version(await self.es_client.index_version(EXPERT_INDEX))
+        for expert_id, expert in experts_dict.items():
+            _expert_cache.put(expert_id, expert.model_copy(update={"score": 0.0}))
+        
         return list(experts_dict.values())
     
     async def search_project_based_experts(self, search_query: SearchQuery) -> List[Expert]:
         """Search experts based on project/agenda matching"""
         logger.info("Starting project-based expert search")
-        project_results = []
+        queries = [search_query.original_query] + search_query.enhanced_queries
+        query_embeddings = self.embedding_gen.generate_embeddings(queries)
         
-        for query in [search_query.original_query] + search_query.enhanced_queries:
-            query_embedding = self.embedding_gen.generate_embedding(query)
-            
-            embedding_fields = [
-                "combined_embedding",
-                "description_embedding",
-                "topic_embedding",
-                "agenda_questions_combined_embedding"
-            ]
-            
-            text_fields = ["description", "topic", "name"]
-            
-            for embed_field in embedding_fields:
-                results = self.es_client.hybrid_search(
-                    index=PROJECT_INDEX,
-                    embedding_field=embed_field,
-                    query_embedding=query_embedding,
-                    text_fields=text_fields,
-                    keywords=search_query.keywords,
-                    size=10
-                )
-                project_results.extend(results)
+        embedding_fields = [
+            "combined_embedding",
+            "description_embedding",
+            "topic_embedding",
+            "agenda_questions_combined_embedding"
+        ]
         
-        expert_ids = set()
-        project_descriptions = []
+        text_fields = ["description", "topic", "name"]
         
+        project_results = await self.es_client.multi_hybrid_search(
+            index=PROJECT_INDEX,
+            embedding_fields=embedding_fields,
+            query_embeddings=query_embeddings,
+            text_fields=text_fields,
+            keywords=search_query.keywords,
+            size=10,
+            source_includes=PROJECT_SOURCE_FIELDS
+        )
+        
+        # Rank experts by the best-scoring project they answered an agenda for
+        expert_scores = {}
         for result in project_results:
-            source = result["_source"]
-            
-            if source.get("agenda_responses"):
-                import re
-                ids = re.findall(r'expert[_\s]*id[s]?[:\s]*(\d+)', 
-                                source["agenda_responses"], re.IGNORECASE)
-                expert_ids.update(int(id) for id in ids if id.isdigit())
-            
-            project_descriptions.append(source.get("description", ""))
+            for response in result["_source"].get("expert_responses") or []:
+                expert_id = response.get("expert_id")
+                if expert_id is None:
+                    continue
+                expert_id = int(expert_id)
+                expert_scores[expert_id] = max(expert_scores.get(expert_id, 0.0), result["_score"] or 0.0)
         
-        logger.info(f"Found {len(expert_ids)} expert IDs from project agenda responses")
+        ranked_ids = sorted(expert_scores, key=expert_scores.get, reverse=True)[:PROJECT_EXPERT_LIMIT]
+        logger.info(f"Found {len(ranked_ids)} expert IDs from project expert responses")
+        if ranked_ids:
+            # The analysed constraints apply to project-linked experts too
+            candidate_ids = ranked_ids
+            ranked_ids = await self._search_relaxing_filters(
+                search_query.filters,
+                lambda filter: self.es_client.filter_ids(EXPERT_INDEX, candidate_ids, filter),
+                lambda expert_id: expert_id
+            )
         experts = []
         
-        if expert_ids:
-            expert_results = self.es_client.get_by_ids(EXPERT_INDEX, list(expert_ids))
-            for result in expert_results:
-                source = result["_source"]
-                experts.append(Expert(
-                    id=source["id"],
-                    bio=source.get("bio", ""),
-                    headline=source.get("headline", ""),
-                    base_location=source.get("base_location"),
-                    expertise_in_these_geographies=source.get("expertise_in_these_geographies", []),
-                    functions=source.get("functions", []),
-                    total_years_of_experience=source.get("total_years_of_experience"),
-                    work_experiences=source.get("work_experiences", []),
-                    score=10.0
-                ))
-        
-        if len(experts) < 5 and project_descriptions:
-            logger.info("Generating expert profiles from project descriptions")
-            
-            for desc in project_descriptions[:3]:
-                try:
-                    expert_profile = await self.llm_client.generate_expert_profile(desc)
-                    logger.info(f"Generated profile: {expert_profile[:100]}...")
-                    
-                    profile_keywords = await self.llm_client.extract_keywords(expert_profile)
-                    
-                    profile_query = SearchQuery(
-                        original_query=expert_profile,
-                        query_type=QueryType.DIRECT_EXPERT,
-                        enhanced_queries=[],
-                        keywords=profile_keywords
-                    )
-                    
-                    profile_experts = await self.search_direct_experts(profile_query)
-                    experts.extend(profile_experts[:5])
-                    
-                except Exception as e:
-                    logger.error(f"Error in profile generation/search: {e}")
-                    continue
+        if ranked_ids:
+            top_score = expert_scores[ranked_ids[0]] or 1.0
+            for expert in await self.get_experts(ranked_ids):
+                # Scaled so the best project match keeps the former fixed score of 10
+                expert.score = 10.0 * expert_scores[expert.id] / top_score
+                experts.append(expert)
+        
+        if len(experts) < 5:
+            logger.info("Few experts linked to matching projects, adding direct matches")
+            experts.extend((await self.search_direct_experts(search_query))[:5])
         
         unique_experts = {}
         for expert in experts:
@@ -171,23 +249,34 @@ class SearchAgent:
             reasoning_parts.append("Performing direct expert search:")
             reasoning_parts.append(f"- Using {len(search_query.enhanced_queries) + 1} query variations")
             reasoning_parts.append(f"- Searching with {len(search_query.keywords)} keywords")
+            if not search_query.filters.is_empty():
+                reasoning_parts.append(
+                    f"- Filtering on {search_query.filters.model_dump(exclude_defaults=True)}"
+                )
             reasoning_parts.append("- Combining semantic and keyword search results")
             
-            experts = await self.search_direct_experts(search_query)
+            with es_profiling.collect_profiles() as profiles:
+                experts = await self.search_direct_experts(search_query)
             
             reasoning_parts.append(f"- Found {len(experts)} unique experts")
             
         else:
             reasoning_parts.append("Performing project-based expert search:")
             reasoning_parts.append("- First searching for similar projects")
+            if not search_query.filters.is_empty():
+                reasoning_parts.append(
+                    f"- Filtering linked experts on {search_query.filters.model_dump(exclude_defaults=True)}"
+                )
             
-            experts = await self.search_project_based_experts(search_query)
+            with es_profiling.collect_profiles() as profiles:
+                experts = await self.search_project_based_experts(search_query)
             
             reasoning_parts.append(f"- Searched project database for matches")
+            reasoning_parts.append("- Ranked experts who answered agendas of the matching projects")
             reasoning_parts.append(f"- Found {len(experts)} relevant experts")
-            
-            if len(experts) == 0:
-                reasoning_parts.append("- No direct expert mappings found, generated ideal profiles")
+        
+        # Only populated when ElasticsearchClient profiling is enabled
+        reasoning_parts.extend(es_profiling.summarize(profiles))
         
         reasoning = "\n".join(reasoning_parts)
         return experts, reasoning
@@ -0,0 +1,102 @@
+"""Compare the PyTorch and ONNX (int8) embedding backends.
+
+Reports per-query latency, batch throughput, embedding agreement and
+recall@k of ONNX query vectors against a corpus indexed with PyTorch
+(which is how the Elasticsearch index was built). Exits non-zero when the
+embeddings drift beyond --tolerance, so it can gate a backend switch.
+
+    python benchmark_embeddings.py --corpus experts.csv --column bio
+"""
+import argparse
+import csv
+import statistics
+import sys
+import time
+from typing import List
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from config.settings import EMBEDDING_MODEL, ONNX_MODEL_PATH
+from tools.onnx_encoder import OnnxSentenceEncoder
+
+
+def load_corpus(path: str, column: str, limit: int) -> List[str]:
+    with open(path, encoding="utf8", errors="ignore", newline="") as f:
+        rows = [r.get(column) or "" for r in csv.DictReader(f)]
+    return [r.strip() for r in rows if r.strip()][:limit]
+
+
+def time_queries(model, queries: List[str]) -> List[float]:
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        model.encode([q])
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def normalize(x: np.ndarray) -> np.ndarray:
+    return x / np.clip(np.linalg.norm(x, axis=1, keepdims=True), 1e-12, None)
+
+
+def top_k(queries: np.ndarray, corpus: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-(normalize(queries) @ normalize(corpus).T), axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--corpus", required=True, help="CSV file with the documents")
+    parser.add_argument("--column", default="bio", help="CSV column holding the text")
+    parser.add_argument("--limit", type=int, default=2000, help="max corpus size")
+    parser.add_argument("--queries", type=int, default=200, help="number of queries to sample")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--tolerance", type=float, default=0.98,
+                        help="minimum cosine between torch and onnx query embeddings")
+    parser.add_argument("--no-quantize", action="store_true", help="benchmark fp32 ONNX instead of int8")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.column, args.limit)
+    if not corpus:
+        sys.exit(f"No text found in column '{args.column}' of {args.corpus}")
+    # Short prefixes of documents stand in for user queries
+    rng = np.random.default_rng(0)
+    picks = rng.choice(len(corpus), size=min(args.queries, len(corpus)), replace=False)
+    queries = [" ".join(corpus[i].split()[:12]) for i in picks]
+
+    torch_model = SentenceTransformer(EMBEDDING_MODEL)
+    onnx_model = OnnxSentenceEncoder(EMBEDDING_MODEL, cache_dir=ONNX_MODEL_PATH,
+                                     quantize=not args.no_quantize)
+    for model in (torch_model, onnx_model):
+        model.encode(["warm up"])
+
+    print(f"Corpus: {len(corpus)} docs, {len(queries)} queries, k={args.k}")
+    corpus_vecs = torch_model.encode(corpus, batch_size=64)
+
+    results = {}
+    for name, model in (("torch", torch_model), ("onnx", onnx_model)):
+        timings = time_queries(model, queries)
+        start = time.perf_counter()
+        vecs = model.encode(queries, batch_size=32)
+        batch_s = time.perf_counter() - start
+        results[name] = vecs
+        p95 = sorted(timings)[int(0.95 * (len(timings) - 1))]
+        print(f"{name:>6}: p50 {statistics.median(timings):6.2f}ms  p95 {p95:6.2f}ms  "
+              f"batch {len(queries) / batch_s:8.1f} q/s")
+
+    cos = np.sum(normalize(results["torch"]) * normalize(results["onnx"]), axis=1)
+    torch_top = top_k(results["torch"], corpus_vecs, args.k)
+    onnx_top = top_k(results["onnx"], corpus_vecs, args.k)
+    recall = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(torch_top, onnx_top)])
+
+    print(f"cosine(torch, onnx): min {cos.min():.4f}  mean {cos.mean():.4f}")
+    print(f"recall@{args.k} of onnx vs torch: {recall:.3f}")
+
+    if cos.min() < args.tolerance:
+        print(f"FAIL: min cosine {cos.min():.4f} below tolerance {args.tolerance}")
+        sys.exit(1)
+    print("OK: onnx embeddings within tolerance")
+
+
+if __name__ == "__main__":
+    main()
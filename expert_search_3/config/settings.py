@@ -12,19 +12,119 @@ ES_NODE = os.getenv("ES_NODE")
 ES_USERNAME = os.getenv("ES_USERNAME")
 ES_PASSWORD = os.getenv("ES_PASSWORD")
 ES_VERIFY_CERTS = False
+# Async transport pool: connections kept alive per node, gzip request/response bodies
+ES_CONNECTIONS_PER_NODE = int(os.getenv("ES_CONNECTIONS_PER_NODE", "25"))
+ES_HTTP_COMPRESS = True
+ES_REQUEST_TIMEOUT = 30
+ES_MAX_RETRIES = 3
+# Deep retrieval (search_after over a point-in-time)
+ES_PAGE_SIZE = 500
+ES_PIT_KEEP_ALIVE = "1m"
+
+# Hybrid search: "native" = one request with query + knn (Elasticsearch 8.8+ for rrf),
+# "client" = two requests fused in Python
+HYBRID_SEARCH_MODE = os.getenv("HYBRID_SEARCH_MODE", "native")
+# "linear" = boosted score sum, "rrf" = reciprocal rank fusion (scale independent)
+HYBRID_FUSION = os.getenv("HYBRID_FUSION", "linear")
+RRF_RANK_CONSTANT = 60
+# kNN candidate pool: num_candidates = max(k * factor, minimum), capped by Elasticsearch at 10000
+KNN_NUM_CANDIDATES_FACTOR = int(os.getenv("KNN_NUM_CANDIDATES_FACTOR", "10"))
+KNN_MIN_NUM_CANDIDATES = int(os.getenv("KNN_MIN_NUM_CANDIDATES", "100"))
+KNN_MAX_NUM_CANDIDATES = 10000
 
 # Index Names
 EXPERT_INDEX = "dynamic_expert_search_v1_0_12_with_embeddings"
 PROJECT_INDEX = "dynamic_project_search_v1_0_6_with_embeddings_v1"
 
+# _source projections: dense vectors are never returned unless requested;
+# searches fetch only the fields the agents turn into models
+SOURCE_EXCLUDES = ["*_embedding"]
+EXPERT_SOURCE_FIELDS = [
+    "id", "bio", "headline", "base_location", "expertise_in_these_geographies",
+    "functions", "total_years_of_experience"
+]
+# Nested expert ids of each project's agenda responses (see project_agenda/create_index.py)
+PROJECT_SOURCE_FIELDS = ["id", "name", "description", "topic", "expert_responses.expert_id"]
+PROJECT_EXPERT_LIMIT = 50
+# Fewer distinct experts than this under the analysed constraints: top the
+# results up with unconstrained matches (constraints come from the LLM)
+FILTER_RELAX_MIN_RESULTS = int(os.getenv("FILTER_RELAX_MIN_RESULTS", "5"))
+
+# In-process cache of hydrated Expert documents, dropped when the index changes
+EXPERT_CACHE_SIZE = int(os.getenv("EXPERT_CACHE_SIZE", "5000"))
+EXPERT_CACHE_TTL = 3600  # seconds
+# "Why relevant" sentences, cached per (query, expert id)
+EXPLANATION_CACHE_SIZE = 2000
+EXPLANATION_CACHE_TTL = 24 * 3600  # seconds
+INDEX_VERSION_CHECK_INTERVAL = 30  # seconds between index change checks
+
+# Expert statuses always searched (comma-separated, empty = any status)
+EXPERT_STATUS_FILTER = [s.strip() for s in os.getenv("EXPERT_STATUS_FILTER", "").split(",") if s.strip()]
+
 # LLM Configuration
 LLM_API_URL = "https://llm-be.domain-name.ai/api/generate"
 LLM_MODEL = "deepseek-r1:32b-qwen-distill-q4_K_M" 
 LLM_TIMEOUT = 120
+# Model routing: templates routed "small" go to LLM_SMALL_MODEL (empty, the
+# default, = always LLM_MODEL) and escalate to LLM_MODEL when the small model's answer is
+# unparseable or its self-reported confidence is below LLM_ESCALATION_CONFIDENCE
+LLM_SMALL_MODEL = os.getenv("LLM_SMALL_MODEL", "")
+LLM_MODEL_ROUTES = {
+    "analyze_query_combined": "small",
+    "enhance_query": "small",
+    "extract_keywords": "small",
+    "explain_relevance": "small",
+    "analyze_query": "large",
+    "rerank": "large",
+    "expert_profile": "large",
+    "expert_relevance": "large"
+}
+LLM_ESCALATION_CONFIDENCE = 0.6
+# Stream reasoning calls and stop generating once the final <answer> has arrived
+LLM_STREAM = os.getenv("LLM_STREAM", "true").lower() == "true"
+# "combined" = one structured JSON call for analysis, variations and keywords;
+# "separate" = three step-by-step reasoning calls
+QUERY_ANALYSIS_MODE = os.getenv("QUERY_ANALYSIS_MODE", "combined")
+# In "separate" mode the three calls run concurrently; a call that takes longer
+# than this (seconds) falls back to its heuristic result instead of stalling
+QUERY_ANALYSIS_CALL_TIMEOUT = float(os.getenv("QUERY_ANALYSIS_CALL_TIMEOUT", "45"))
+# Shared HTTP connection pool to the LLM backend (HTTP/2 when `h2` is installed)
+LLM_HTTP2 = True
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = 10
+LLM_KEEPALIVE_EXPIRY = 120  # seconds an idle connection stays open
+# Client-side scheduling: concurrent requests to the backend, total time a call
+# may take including its wait for a slot, and the circuit breaker that sends
+# calls straight to the fallback after repeated failures
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "90"))  # seconds
+LLM_BREAKER_FAILURE_THRESHOLD = 5
+LLM_BREAKER_RESET_TIMEOUT = 30  # seconds before a probe request is let through
+# Prompt token budgets per template; expert text is truncated to fit
+PROMPT_TOKEN_BUDGETS = {
+    "default": 2000,
+    "rerank": 1500,
+    "explain_relevance": 2000,
+    "expert_relevance": 400,
+    "expert_profile": 800
+}
 
 # Embedding Model
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 EMBEDDING_DIM = 384
+# "torch" (SentenceTransformer) or "onnx" (ONNX Runtime, int8-quantised, CPU)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
+# Reranking: "cross_encoder" scores the top RERANK_CANDIDATES locally on CPU;
+# "llm" is the original remote LLM ranking of the top 10. With
+# RERANK_LLM_FINAL_STAGE the LLM additionally reorders the cross-encoder's top few.
+RERANKER_BACKEND = os.getenv("RERANKER_BACKEND", "cross_encoder")
+RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANKER_MAX_LENGTH = 256  # tokens per (query, expert) pair
+RERANKER_BATCH_SIZE = 32
+RERANK_CANDIDATES = 100
+RERANK_LLM_FINAL_STAGE = os.getenv("RERANK_LLM_FINAL_STAGE", "false").lower() == "true"
+RERANK_LLM_TOP_N = 5
 
 # Configuration
 MAX_SEARCH_ITERATIONS = 10
@@ -37,3 +137,19 @@ DATA_PATH = "data"
 LEARNING_STORAGE_PATH = os.path.join(DATA_PATH, "learning")
 SESSION_STORAGE_PATH = os.path.join(DATA_PATH, "sessions")
 FEEDBACK_STORAGE_PATH = os.path.join(DATA_PATH, "feedback")
+ONNX_MODEL_PATH = os.path.join(DATA_PATH, "onnx")
+
+# Query profiling (opt-in): per-clause timings in reasoning traces and a
+# JSONL log of queries Elasticsearch took longer than the threshold to run
+ES_PROFILE = os.getenv("ES_PROFILE", "false").lower() == "true"
+SLOW_QUERY_THRESHOLD_MS = int(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500"))
+SLOW_QUERY_LOG_PATH = os.path.join(DATA_PATH, "slow_queries.jsonl")
+
+# Persistent LLM response cache for query-level calls (analysis, variations,
+# keywords). A semantic threshold > 0 also reuses variations and keywords for
+# near-duplicate queries whose embedding cosine similarity reaches it (never the
+# analysis, whose constraints become search filters); 0, the default, disables it.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.path.join(DATA_PATH, "llm_cache.sqlite3")
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+LLM_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD", "0"))
@@ -5,6 +5,7 @@ from monitoring.background_monitor import BackgroundMonitor
 from utils.session_manager import SessionManager
 from utils.feedback_manager import FeedbackManager
 from models.schemas import Expert, AgentState
+from utils import metrics
 from typing import List, Dict, Any, Optional
 import logging
 from datetime import datetime
@@ -33,6 +34,9 @@ class AutonomousExpertSearchAgent:
             self.feedback_manager = FeedbackManager()  # Added feedback manager
             self.current_session_id = None
             self.show_reasoning = True
+            self.live_reasoning = False  # print LLM reasoning tokens as they stream
+            self.show_explanations = False  # "why relevant" costs an LLM call per search
+            self.last_results = None  # (query, experts) of the last search, for "explain"
             self.autonomous_mode = False
             self.active_searches = {}
             self.last_strategy_used = None  # Track for feedback
@@ -66,6 +70,23 @@ class AutonomousExpertSearchAgent:
             if trace.decision:
                 print(f"Decision: {trace.decision}")
     
+    async def explain_experts(self, query: str, experts: List[Expert]):
+        """Fill in "why relevant" for the experts about to be displayed"""
+        if not experts:
+            return
+        try:
+            explanations = await self.workflow.llm_client.explain_relevance(
+                query, [expert.model_dump(include={"id", "headline", "bio"}) for expert in experts]
+            )
+            for expert in experts:
+                expert.relevance_explanation = explanations.get(expert.id)
+        except Exception as e:
+            logger.error(f"Error explaining relevance: {e}")
+    
+    def print_reasoning_token(self, token: str):
+        """Echo a streamed LLM reasoning token"""
+        print(token, end="", flush=True)
+    
     def display_experts(self, experts: List[Expert]):
         """Display experts with enhanced information"""
         if not experts:
@@ -162,6 +183,10 @@ class AutonomousExpertSearchAgent:
         print("=" * 70)
 
         try:
+            self.workflow.llm_client.on_reasoning_token = (
+                self.print_reasoning_token if self.show_reasoning and self.live_reasoning else None
+            )
+            
             # Run autonomous workflow
             result = await self.workflow.run(query, target_quality)
             
@@ -175,8 +200,11 @@ class AutonomousExpertSearchAgent:
             if self.show_reasoning:
                 self.display_reasoning(result.reasoning_traces)
 
-            # Display results
+            # Display results (explanations only for the experts shown)
+            if self.show_explanations:
+                await self.explain_experts(query, result.experts[:10])
             self.display_experts(result.experts)
+            self.last_results = (query, result.experts)
 
             # Display quality and suggestions
             print(f"\nSearch Quality: {result.quality_score:.2f}")
@@ -259,11 +287,31 @@ class AutonomousExpertSearchAgent:
                 elif command.lower().startswith('reasoning'):
                     if 'off' in command:
                         self.show_reasoning = False
+                        self.live_reasoning = False
                         print("Reasoning display OFF")
+                    elif 'live' in command:
+                        self.show_reasoning = True
+                        self.live_reasoning = True
+                        print("Reasoning display ON (streaming LLM reasoning live)")
                     else:
                         self.show_reasoning = True
                         print("Reasoning display ON")
                 
+                elif command.lower().startswith('explain'):
+                    if 'off' in command:
+                        self.show_explanations = False
+                        print("Relevance explanations OFF")
+                    elif 'on' in command.split():
+                        self.show_explanations = True
+                        print("Relevance explanations ON (one extra LLM call per search)")
+                    elif self.last_results:
+                        # On demand: explain the results already on screen
+                        query, experts = self.last_results
+                        await self.explain_experts(query, experts[:10])
+                        self.display_experts(experts)
+                    else:
+                        print("No results to explain yet")
+                
                 else:
                     # Treat as search query
                     await self.autonomous_search(command)
@@ -287,6 +335,19 @@ class AutonomousExpertSearchAgent:
         print("\nStrategy Performance:")
         for name, strategy in self.workflow.learning_agent.storage.strategies.items():
             print(f"  - {name}: {strategy.success_rate:.2f} success rate ({strategy.usage_count} uses)")
+        
+        # Where LLM time and tokens go, per prompt template
+        histograms = metrics.get_histograms()
+        latencies = {k: v for k, v in histograms.items() if k.startswith("llm_latency_ms{")}
+        if latencies:
+            print("\nLLM Usage:")
+            for key, latency in sorted(latencies.items(), key=lambda x: x[1]["sum"], reverse=True):
+                labels = key[len("llm_latency_ms"):]
+                prompt_tokens = histograms.get(f"llm_prompt_tokens{labels}", {})
+                completion_tokens = histograms.get(f"llm_completion_tokens{labels}", {})
+                print(f"  - {labels[1:-1]}: {latency['count']} calls, {latency['sum'] / 1000:.1f}s total, "
+                      f"mean {latency['mean']:.0f}ms, "
+                      f"~{prompt_tokens.get('mean', 0):.0f} prompt / {completion_tokens.get('mean', 0):.0f} completion tokens")
     
     def show_help(self):
         """Show help"""
@@ -305,6 +366,7 @@ class AutonomousExpertSearchAgent:
 
 async def main():
     """Main entry point"""
+    agent = None
     try:
         agent = AutonomousExpertSearchAgent()
         await agent.interactive_mode()
@@ -312,6 +374,9 @@ async def main():
         logger.error(f"Fatal error: {e}")
         print(f"\nFatal error: {str(e)}")
         sys.exit(1)
+    finally:
+        if agent is not None:
+            await agent.workflow.aclose()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -78,11 +78,21 @@ class Project(BaseModel):
     agenda_responses: Optional[str] = None
     expert_ids: Optional[List[int]] = []
 
+class SearchFilters(BaseModel):
+    """Hard constraints from query analysis, applied as Elasticsearch filters"""
+    geographies: List[str] = []
+    min_years_of_experience: Optional[int] = None
+    functions: List[str] = []
+    
+    def is_empty(self) -> bool:
+        return not (self.geographies or self.min_years_of_experience or self.functions)
+
 class SearchQuery(BaseModel):
     original_query: str
     query_type: QueryType
     enhanced_queries: List[str] = []
     keywords: List[str] = []
+    filters: SearchFilters = Field(default_factory=SearchFilters)
     reasoning: Optional[ReasoningTrace] = None
     target_quality: float = 0.8
     max_iterations: int = 10
@@ -0,0 +1,81 @@
+"""Summarise the Elasticsearch slow-query log by query shape.
+
+Queries are grouped by structure (literals and vectors stripped), ranked by
+total server time, and shown with their hottest clauses. The log is written
+by ElasticsearchClient when profiling is enabled (ES_PROFILE=true).
+
+    python slow_query_report.py --top 5
+"""
+import argparse
+import json
+import math
+import statistics
+import sys
+from collections import defaultdict
+from typing import List, Dict
+
+from config.settings import SLOW_QUERY_LOG_PATH
+
+
+def load_records(path: str, min_took: float) -> List[Dict]:
+    records = []
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if (record.get("took_ms") or 0) >= min_took:
+                records.append(record)
+    return records
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--log", default=SLOW_QUERY_LOG_PATH, help="slow-query JSONL file")
+    parser.add_argument("--top", type=int, default=10, help="number of query shapes to show")
+    parser.add_argument("--clauses", type=int, default=5, help="clauses to show per shape")
+    parser.add_argument("--min-took", type=float, default=0, help="ignore queries faster than this (ms)")
+    parser.add_argument("--show-shape", action="store_true", help="print the query structure of each shape")
+    args = parser.parse_args()
+
+    try:
+        records = load_records(args.log, args.min_took)
+    except FileNotFoundError:
+        sys.exit(f"No slow-query log at {args.log}; run searches with ES_PROFILE=true")
+    if not records:
+        sys.exit("No slow queries recorded")
+
+    groups = defaultdict(list)
+    for record in records:
+        groups[record["shape_id"]].append(record)
+
+    ranked = sorted(groups.values(), key=lambda g: sum(r["took_ms"] for r in g), reverse=True)
+    print(f"{len(records)} slow queries, {len(groups)} shapes\n")
+
+    for group in ranked[:args.top]:
+        took = [r["took_ms"] for r in group]
+        indices = sorted({r.get("index") or "?" for r in group})
+        print(f"shape {group[0]['shape_id']}  x{len(group)}  total {sum(took)}ms  "
+              f"p50 {statistics.median(took):.0f}ms  p95 {percentile(took, 0.95):.0f}ms  "
+              f"max {max(took)}ms  [{', '.join(indices)}]")
+
+        clauses = defaultdict(float)
+        for record in group:
+            for name, ms in record.get("clauses", {}).items():
+                clauses[name] += ms
+        for name, ms in sorted(clauses.items(), key=lambda x: x[1], reverse=True)[:args.clauses]:
+            print(f"    {ms / len(group):9.1f}ms avg  {name.strip()}")
+
+        if args.show_shape:
+            print("    " + json.dumps(group[0]["shape"], sort_keys=True))
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from config.settings import LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_SEMANTIC_THRESHOLD
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the answer"""
+    return " ".join(query.lower().split()).strip(" ?.!")
+
+
+class LLMResponseCache:
+    """LLM results persisted in SQLite, keyed on (model, template, normalised
+    query, parameters) and expiring after `ttl` seconds.
+
+    Entries stored with a query embedding can also be found by similarity:
+    `get_similar` returns the closest entry for the same model, template and
+    parameters when its cosine similarity reaches `semantic_threshold`.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL,
+                 semantic_threshold: float = LLM_CACHE_SEMANTIC_THRESHOLD, semantic_scan_limit: int = 500):
+        self.path = path
+        self.ttl = ttl
+        self.semantic_threshold = semantic_threshold
+        self.semantic_scan_limit = semantic_scan_limit
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                template TEXT NOT NULL,
+                params TEXT NOT NULL,
+                query TEXT NOT NULL,
+                embedding BLOB,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_lookup ON llm_cache (model, template, params, created_at)"
+        )
+        self.purge_expired()
+
+    @staticmethod
+    def make_key(model: str, template: str, query: str, params: Dict[str, Any]) -> Tuple[str, str]:
+        """(cache key, canonical parameter JSON)"""
+        params_json = json.dumps(params, sort_keys=True, default=str)
+        raw = json.dumps([model, template, normalize_query(query), params_json])
+        return hashlib.sha256(raw.encode()).hexdigest(), params_json
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.semantic_threshold > 0
+
+    def get(self, model: str, template: str, query: str, params: Dict[str, Any]) -> Optional[Any]:
+        """Cached value for the exact (normalised) query, or None"""
+        key, _ = self.make_key(model, template, query, params)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.ttl)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def get_similar(self, model: str, template: str, query: str, params: Dict[str, Any],
+                    embedding: List[float]) -> Optional[Any]:
+        """Cached value of the most similar recent query, or None below the threshold"""
+        if not self.semantic_enabled:
+            return None
+        _, params_json = self.make_key(model, template, query, params)
+        similar = self._nearest(model, template, params_json, embedding)
+        if similar is None:
+            return None
+        value, cached_query, similarity = similar
+        logger.info(f"LLM cache: reusing '{cached_query}' for '{query}' (similarity {similarity:.3f})")
+        return value
+
+    def record(self, result: str):
+        """Count a lookup outcome ("hit", "semantic_hit" or "miss")"""
+        counter = {"hit": "hits", "semantic_hit": "semantic_hits", "miss": "misses"}[result]
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _nearest(self, model: str, template: str, params_json: str,
+                 embedding: List[float]) -> Optional[Tuple[Any, str, float]]:
+        """(value, cached query, similarity) of the most similar recent entry
+        with the same model, template and parameters, if above the threshold"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT query, embedding, value FROM llm_cache "
+                "WHERE model = ? AND template = ? AND params = ? AND created_at >= ? AND embedding IS NOT NULL "
+                "ORDER BY created_at DESC LIMIT ?",
+                (model, template, params_json, time.time() - self.ttl, self.semantic_scan_limit)
+            ).fetchall()
+        if not rows:
+            return None
+
+        vectors = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+        query_vec = np.asarray(embedding, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query_vec)
+        similarities = vectors @ query_vec / np.where(norms == 0, 1.0, norms)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.semantic_threshold:
+            return None
+        return json.loads(rows[best][2]), rows[best][0], float(similarities[best])
+
+    def put(self, model: str, template: str, query: str, params: Dict[str, Any], value: Any,
+            embedding: Optional[List[float]] = None):
+        key, params_json = self.make_key(model, template, query, params)
+        blob = np.asarray(embedding, dtype=np.float32).tobytes() if embedding is not None else None
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, model, template, params_json, normalize_query(query), blob,
+                     json.dumps(value), time.time())
+                )
+                self._conn.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.error(f"Error writing LLM cache entry: {e}")
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            self._conn.commit()
+        return deleted
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "size": size,
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.semantic_hits) / lookups, 3) if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,66 @@
+from typing import Any, Dict, List, Optional
+
+
+class FakeIndices:
+    async def stats(self, **kwargs):
+        return {"indices": {}}
+
+
+class FakeElasticsearch:
+    """In-memory stand-in for AsyncElasticsearch: documents keyed by _id,
+    _mget by _id, and `terms` queries on `id`; kNN and keyword searches
+    match every document in insertion order. Every call is recorded"""
+
+    def __init__(self, docs: Optional[Dict[str, Dict[str, Any]]] = None,
+                 msearch_error: Optional[Exception] = None, version: str = "8.12.0"):
+        self.docs = docs or {}
+        self.msearch_error = msearch_error
+        self.version = version
+        self.calls: List[tuple] = []
+        self.indices = FakeIndices()
+
+    def _response(self, body: Dict) -> Dict:
+        query = body.get("query", {})
+        if "knn" in body or "should" in query.get("bool", {}):
+            hits = [{"_id": doc_id, "_score": 1.0, "_source": source} for doc_id, source in self.docs.items()]
+            return {"hits": {"hits": hits[:body.get("size", 10)]}} if hits else {}
+        wanted = query.get("terms", {}).get("id")
+        if wanted is None:
+            return {}
+        hits = [
+            {"_id": doc_id, "_score": 1.0, "_source": source}
+            for doc_id, source in self.docs.items() if source.get("id") in wanted
+        ]
+        return {"hits": {"hits": hits}} if hits else {}
+
+    async def info(self, **kwargs):
+        self.calls.append(("info", kwargs))
+        return {"version": {"number": self.version}}
+
+    async def open_point_in_time(self, **kwargs):
+        self.calls.append(("open_point_in_time", kwargs))
+        return {"id": "pit"}
+
+    async def close_point_in_time(self, **kwargs):
+        self.calls.append(("close_point_in_time", kwargs))
+
+    async def mget(self, index, ids, **kwargs):
+        self.calls.append(("mget", ids))
+        return {"docs": [
+            {"_id": doc_id, "found": True, "_source": self.docs[doc_id]} if doc_id in self.docs
+            else {"_id": doc_id, "found": False}
+            for doc_id in ids
+        ]}
+
+    async def search(self, body=None, **kwargs):
+        self.calls.append(("search", body))
+        return self._response(body or {})
+
+    async def msearch(self, searches, **kwargs):
+        self.calls.append(("msearch", searches))
+        if self.msearch_error is not None:
+            raise self.msearch_error
+        return {"responses": [self._response(body) for body in searches[1::2]]}
+
+    async def close(self):
+        pass
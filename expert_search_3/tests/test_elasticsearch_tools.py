@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("elasticsearch")
+
+from fakes import FakeElasticsearch
+from tools.elasticsearch_tools import ElasticsearchClient
+
+
+def make_client(es=None) -> ElasticsearchClient:
+    # Bypass __init__, which pings a real cluster
+    client = ElasticsearchClient.__new__(ElasticsearchClient)
+    client.profile = False
+    client.client = es or FakeElasticsearch()
+    client._index_versions = {}
+    client._server_version = None
+    return client
+
+
+async def collect(iterator):
+    return [hit async for hit in iterator]
+
+
+@pytest.mark.parametrize("keywords", [[], ["a", "?", " - "]])
+def test_iter_keyword_search_without_usable_keywords_yields_nothing(keywords):
+    client = make_client()
+    hits = asyncio.run(collect(client.iter_keyword_search(
+        "experts", ["bio"], keywords, filter=[{"term": {"status": "active"}}]
+    )))
+    assert hits == []
+    assert client.client.calls == []
+
+
+def test_get_by_ids_uses_mget_when_id_matches():
+    es = FakeElasticsearch({"1": {"id": 1}, "2": {"id": 2}})
+    client = make_client(es)
+    docs = asyncio.run(client.get_by_ids("experts", [2, 1]))
+    assert [d["_source"]["id"] for d in docs] == [2, 1]
+    assert [call[0] for call in es.calls] == ["mget"]
+
+
+def test_get_by_ids_falls_back_to_id_field():
+    # Expert 7 indexed under an unrelated _id; _id "8" holds a different expert
+    es = FakeElasticsearch({"1": {"id": 1}, "abc": {"id": 7}, "8": {"id": 9}})
+    client = make_client(es)
+    docs = asyncio.run(client.get_by_ids("experts", [7, 1, 8]))
+    assert [d["_source"]["id"] for d in docs] == [7, 1]
+
+
+EMBEDDINGS = [[0.1, 0.2], [0.3, 0.4]]
+FIELDS = ["bio_embedding", "headline_embedding"]
+
+
+def run_multi_hybrid(client, mode):
+    return asyncio.run(client.multi_hybrid_search(
+        "experts", FIELDS, EMBEDDINGS, ["bio"], ["cloud", "security"], size=5, mode=mode, fusion="rrf"
+    ))
+
+
+def test_multi_hybrid_search_sends_keyword_query_once():
+    es = FakeElasticsearch({"1": {"id": 1}, "2": {"id": 2}})
+    client = make_client(es)
+    hits = run_multi_hybrid(client, "native")
+    assert [call[0] for call in es.calls] == ["msearch"]
+    bodies = es.calls[0][1][1::2]
+    assert sum("query" in body for body in bodies) == 1
+    assert sum("knn" in body for body in bodies) == len(FIELDS) * len(EMBEDDINGS)
+    # One fused result list per (variant, field)
+    assert len(hits) == 2 * len(FIELDS) * len(EMBEDDINGS)
+
+
+def test_multi_hybrid_search_reruns_failed_msearch_separately():
+    es = FakeElasticsearch({"1": {"id": 1}, "2": {"id": 2}}, msearch_error=RuntimeError("boom"))
+    client = make_client(es)
+    hits = run_multi_hybrid(client, "native")
+    searches = [body for name, body in es.calls if name == "search"]
+    assert sum("query" in body for body in searches) == 1
+    assert sum("knn" in body for body in searches) == len(FIELDS) * len(EMBEDDINGS)
+    assert len(hits) == 2 * len(FIELDS) * len(EMBEDDINGS)
+
+
+def test_multi_hybrid_search_client_mode_matches_native():
+    docs = {"1": {"id": 1}, "2": {"id": 2}}
+    native = run_multi_hybrid(make_client(FakeElasticsearch(docs)), "native")
+    client = run_multi_hybrid(make_client(FakeElasticsearch(docs)), "client")
+    assert client == native
+
+
+@pytest.mark.parametrize("version, window_key", [
+    ("8.12.2", "window_size"),
+    ("8.14.0", "rank_window_size"),
+    ("8.15.1-SNAPSHOT", "rank_window_size"),
+])
+def test_native_rrf_names_window_for_server_version(version, window_key):
+    es = FakeElasticsearch({"1": {"id": 1}}, version=version)
+    client = make_client(es)
+    asyncio.run(client.hybrid_search(
+        "experts", "bio_embedding", [0.1, 0.2], ["bio"], ["cloud"], size=5, mode="native", fusion="rrf"
+    ))
+    asyncio.run(client.hybrid_search(
+        "experts", "bio_embedding", [0.1, 0.2], ["bio"], ["cloud"], size=5, mode="native", fusion="rrf"
+    ))
+    bodies = [body for name, body in es.calls if name == "search"]
+    assert [set(body["rank"]["rrf"]) for body in bodies] == [{window_key, "rank_constant"}] * 2
+    # The version is read once per client
+    assert [name for name, _ in es.calls].count("info") == 1
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from storage.llm_cache import LLMResponseCache
+from tools.llm_tools import LLMClient
+
+
+class FakeLLMClient(LLMClient):
+    """Answers every prompt with `reply`, counting backend calls"""
+
+    def __init__(self, reply: str, **kwargs):
+        super().__init__(**kwargs)
+        self.reply = reply
+        self.calls = 0
+
+    async def generate_stream(self, prompt, format=None, think=None, stop_when=None, on_token=None,
+                              template="generic", model=None):
+        self.calls += 1
+        return self.reply
+
+    async def generate_with_reasoning(self, prompt, stream=False, reasoning=True, template="generic",
+                                      model=None):
+        self.calls += 1
+        return self.reply, ""
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm_cache.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def test_parsed_answer_is_cached(cache):
+    client = FakeLLMClient('{"query_type": "direct_expert", "enhanced_queries": ["aws architect"], '
+                           '"keywords": ["aws"]}', cache=cache)
+    first = asyncio.run(client.analyze_query_combined("AWS expert"))
+    second = asyncio.run(client.analyze_query_combined("aws expert?"))
+    assert first == second
+    assert client.calls == 1
+    assert cache.stats()["size"] == 1
+
+
+@pytest.mark.parametrize("method", [
+    "analyze_query_combined",
+    "analyze_query_with_reasoning",
+    "enhance_query_with_reasoning",
+    "extract_keywords_with_reasoning",
+])
+def test_parse_failure_defaults_are_not_cached(cache, method):
+    client = FakeLLMClient("", cache=cache)
+    first = asyncio.run(getattr(client, method)("cloud migration project"))
+    second = asyncio.run(getattr(client, method)("cloud migration project"))
+    assert first == second
+    assert client.calls == 2
+    assert cache.stats()["size"] == 0
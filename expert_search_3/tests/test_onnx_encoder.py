@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+# tools/__init__ imports the Elasticsearch, LLM and embedding clients
+pytest.importorskip("elasticsearch")
+pytest.importorskip("httpx")
+pytest.importorskip("sentence_transformers")
+
+from tools.onnx_encoder import (
+    MIN_PROBE_COSINE, PROBE_TEXTS, OnnxAccuracyError, OnnxSentenceEncoder, min_cosine_similarity
+)
+
+
+def make_encoder(embeddings) -> OnnxSentenceEncoder:
+    # Bypass __init__, which exports and loads a real model
+    encoder = OnnxSentenceEncoder.__new__(OnnxSentenceEncoder)
+    encoder.model_dir = "data/onnx/test"
+    encoder.encode = lambda texts: np.asarray(embeddings, dtype=np.float32)
+    return encoder
+
+
+def reference_embeddings() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(len(PROBE_TEXTS), 16)).astype(np.float32)
+
+
+def test_min_cosine_similarity_is_one_for_scaled_copies():
+    reference = reference_embeddings()
+    assert min_cosine_similarity(reference, reference * 3) == pytest.approx(1.0)
+
+
+def test_accuracy_check_passes_for_small_quantisation_noise():
+    reference = reference_embeddings()
+    noisy = reference + np.random.default_rng(1).normal(scale=0.01, size=reference.shape)
+    make_encoder(noisy)._check_accuracy(reference.tolist(), MIN_PROBE_COSINE)
+
+
+def test_accuracy_check_rejects_drifted_model():
+    reference = reference_embeddings()
+    drifted = reference.copy()
+    drifted[0] = -drifted[0]
+    with pytest.raises(OnnxAccuracyError):
+        make_encoder(drifted)._check_accuracy(reference.tolist(), MIN_PROBE_COSINE)
+
+
+def test_accuracy_check_skips_exports_without_probes():
+    make_encoder(np.zeros((len(PROBE_TEXTS), 16)))._check_accuracy(None, MIN_PROBE_COSINE)
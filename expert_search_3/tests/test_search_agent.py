@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+for module in ("elasticsearch", "pydantic", "sentence_transformers", "httpx"):
+    pytest.importorskip(module)
+
+from fakes import FakeElasticsearch
+from agents import search_agent
+from agents.search_agent import SearchAgent
+from tools.elasticsearch_tools import ElasticsearchClient
+
+
+def expert_source(expert_id: int) -> dict:
+    return {"id": expert_id, "bio": f"bio {expert_id}", "headline": f"headline {expert_id}"}
+
+
+@pytest.fixture
+def agent():
+    es = FakeElasticsearch({"1": expert_source(1), "legacy-7": expert_source(7)})
+    es_client = ElasticsearchClient.__new__(ElasticsearchClient)
+    es_client.profile = False
+    es_client.client = es
+    es_client._index_versions = {}
+    # Bypass __init__, which connects to Elasticsearch and loads the embedding model
+    agent = SearchAgent.__new__(SearchAgent)
+    agent.es_client = es_client
+    search_agent._expert_cache.clear()
+    yield agent
+    search_agent._expert_cache.clear()
+
+
+def test_get_experts_hydrates_expert_whose_id_differs_from_es_id(agent):
+    experts = asyncio.run(agent.get_experts([7, 1]))
+    assert [e.id for e in experts] == [7, 1]
+
+
+def test_get_experts_serves_fallback_lookups_from_cache(agent):
+    asyncio.run(agent.get_experts([7, 1]))
+    es = agent.es_client.client
+    es.calls.clear()
+    experts = asyncio.run(agent.get_experts([1, 7]))
+    assert [e.id for e in experts] == [1, 7]
+    assert es.calls == []
@@ -1,217 +1,682 @@
-from elasticsearch import Elasticsearch
-from typing import List, Dict, Any, Union
+from elasticsearch import AsyncElasticsearch, Elasticsearch
+from typing import List, Dict, Any, Optional, Union, AsyncIterator
+import asyncio
+import time
 import numpy as np
 import re
-from config.settings import ES_NODE, ES_USERNAME, ES_PASSWORD, EXPERT_INDEX, PROJECT_INDEX, ES_VERIFY_CERTS
+from config.settings import (
+    ES_NODE, ES_USERNAME, ES_PASSWORD, EXPERT_INDEX, PROJECT_INDEX, ES_VERIFY_CERTS,
+    HYBRID_SEARCH_MODE, HYBRID_FUSION, RRF_RANK_CONSTANT,
+    ES_CONNECTIONS_PER_NODE, ES_REQUEST_TIMEOUT, ES_MAX_RETRIES, ES_HTTP_COMPRESS,
+    KNN_NUM_CANDIDATES_FACTOR, KNN_MIN_NUM_CANDIDATES, KNN_MAX_NUM_CANDIDATES,
+    SOURCE_EXCLUDES, INDEX_VERSION_CHECK_INTERVAL, ES_PAGE_SIZE, ES_PIT_KEEP_ALIVE,
+    ES_PROFILE, SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_LOG_PATH
+)
+from utils import metrics
+from tools import es_profiling
 import logging
 import json
 
 logger = logging.getLogger(__name__)
 
+# Only the parts of a hit the agents read; drops _index, _ignored, shard and
+# timing metadata from the response before it is decoded
+HIT_FILTER_PATH = "hits.hits._id,hits.hits._score,hits.hits._source"
+PAGE_FILTER_PATH = "pit_id,hits.hits._id,hits.hits._score,hits.hits._source,hits.hits.sort"
+MGET_FILTER_PATH = "docs._id,docs.found,docs._source"
+MSEARCH_FILTER_PATH = (
+    "responses.status,responses.error,"
+    "responses.hits.hits._id,responses.hits.hits._score,responses.hits.hits._source"
+)
+# Native RRF needs Elasticsearch 8.8+; 8.14 renamed rank.rrf.window_size
+RRF_RANK_WINDOW_SIZE_SINCE = (8, 14)
+
+async def _no_hits() -> AsyncIterator[Dict]:
+    """Empty hit stream"""
+    return
+    yield
+
+
 class ElasticsearchClient:
-    def __init__(self):
+    """Async Elasticsearch access for the agents.
+    
+    All search methods are coroutines backed by one pooled AsyncElasticsearch
+    transport, so concurrent sessions share keep-alive connections instead of
+    blocking the event loop behind each other.
+    """
+    
+    def __init__(self, profile: bool = ES_PROFILE):
+        # Opt-in: adds `profile: true` to searches and records per-clause timings
+        self.profile = profile
+        connection_args = {
+            "basic_auth": (ES_USERNAME, ES_PASSWORD),
+            "verify_certs": ES_VERIFY_CERTS,
+            "ssl_show_warn": False
+        }
         try:
-            self.client = Elasticsearch(
+            # Fail fast on a bad node/credentials; the async transport cannot
+            # be pinged here because agents are constructed outside the loop
+            with Elasticsearch([ES_NODE], **connection_args) as probe:
+                if not probe.ping():
+                    logger.error("Failed to connect to Elasticsearch")
+                    raise ConnectionError("Cannot connect to Elasticsearch")
+            
+            self.client = AsyncElasticsearch(
                 [ES_NODE],
-                basic_auth=(ES_USERNAME, ES_PASSWORD),
-                verify_certs=ES_VERIFY_CERTS,
-                ssl_show_warn=False
+                connections_per_node=ES_CONNECTIONS_PER_NODE,
+                http_compress=ES_HTTP_COMPRESS,
+                request_timeout=ES_REQUEST_TIMEOUT,
+                max_retries=ES_MAX_RETRIES,
+                retry_on_timeout=True,
+                **connection_args
             )
-            if not self.client.ping():
-                logger.error("Failed to connect to Elasticsearch")
-                raise ConnectionError("Cannot connect to Elasticsearch")
+            self._index_versions: Dict[str, tuple] = {}
+            self._server_version: Optional[tuple] = None
         except Exception as e:
             logger.error(f"Error initializing Elasticsearch client: {e}")
             raise
     
-    def semantic_search(self, index: str, embedding_field: str, 
-                       query_embedding: List[float], size: int = 10) -> List[Dict]:
-        """Perform semantic search using knn search"""
+    async def close(self):
+        """Release the pooled connections"""
+        await self.client.close()
+    
+    async def index_version(self, index: str) -> Optional[str]:
+        """Token that changes whenever documents are indexed into or deleted
+        from `index`; re-read at most every INDEX_VERSION_CHECK_INTERVAL seconds"""
+        checked_at, version = self._index_versions.get(index, (0.0, None))
+        if time.monotonic() - checked_at < INDEX_VERSION_CHECK_INTERVAL:
+            return version
+        
         try:
+            response = await self.client.indices.stats(
+                index=index, metric="indexing",
+                filter_path="indices.*.uuid,indices.*.primaries.indexing.index_total,"
+                            "indices.*.primaries.indexing.delete_total"
+            )
+            body = getattr(response, "body", response)
+            parts = []
+            for name, stats in sorted(body.get("indices", {}).items()):
+                indexing = stats.get("primaries", {}).get("indexing", {})
+                parts.append(f"{stats.get('uuid', name)}:{indexing.get('index_total', 0)}:{indexing.get('delete_total', 0)}")
+            version = "|".join(parts) or None
+        except Exception as e:
+            logger.error(f"Index version check error: {e}")
+            version = None
+        
+        self._index_versions[index] = (time.monotonic(), version)
+        return version
+    
+    async def server_version(self) -> tuple:
+        """(major, minor) of the cluster, read once; (0, 0) while unknown"""
+        if self._server_version is None:
+            try:
+                response = await self.client.info(filter_path="version.number")
+                number = getattr(response, "body", response)["version"]["number"]
+                self._server_version = tuple(int(part) for part in number.split("-")[0].split(".")[:2])
+            except Exception as e:
+                logger.error(f"Elasticsearch version check error: {e}")
+                return (0, 0)
+        return self._server_version
+    
+    async def _search(self, body: Dict, filter_path: str, **kwargs):
+        if not self.profile:
+            return await self.client.search(body=body, filter_path=filter_path, **kwargs)
+        
+        # RRF ranking rejects `profile`; such requests still report `took`
+        if "rank" not in body:
+            body = dict(body, profile=True)
+        start = time.perf_counter()
+        response = await self.client.search(body=body, filter_path=f"{filter_path},took,profile", **kwargs)
+        self._record_profile(kwargs.get("index"), body, getattr(response, "body", response),
+                             (time.perf_counter() - start) * 1000)
+        return response
+    
+    async def _msearch(self, searches: List[Dict]) -> List[Dict]:
+        """Responses of an _msearch given as alternating header/body entries"""
+        if not self.profile:
+            return (await self.client.msearch(searches=searches, filter_path=MSEARCH_FILTER_PATH))["responses"]
+        
+        searches = [
+            dict(entry, profile=True) if i % 2 and "rank" not in entry else entry
+            for i, entry in enumerate(searches)
+        ]
+        start = time.perf_counter()
+        responses = (await self.client.msearch(
+            searches=searches, filter_path=f"{MSEARCH_FILTER_PATH},responses.took,responses.profile"
+        ))["responses"]
+        wall_ms = (time.perf_counter() - start) * 1000
+        for header, body, response in zip(searches[::2], searches[1::2], responses):
+            self._record_profile(header.get("index"), body, response, wall_ms)
+        return responses
+    
+    def _record_profile(self, index: Optional[str], body: Dict, response: Dict, wall_ms: float):
+        try:
+            es_profiling.record(
+                es_profiling.build_record(index, body, response, wall_ms),
+                SLOW_QUERY_LOG_PATH, SLOW_QUERY_THRESHOLD_MS
+            )
+        except Exception as e:
+            logger.error(f"Error recording query profile: {e}")
+    
+    @staticmethod
+    def _source_filter(includes: Optional[List[str]] = None,
+                       excludes: Optional[List[str]] = None) -> Dict:
+        """_source projection; dense vectors are excluded unless asked for"""
+        source = {"excludes": SOURCE_EXCLUDES if excludes is None else excludes}
+        if includes:
+            source["includes"] = includes
+        return source
+    
+    @staticmethod
+    def _hits(response) -> List[Dict]:
+        """Compact hits ({_id, _score, _source}); filter_path omits `hits` when nothing matched"""
+        body = getattr(response, "body", response)
+        return body.get("hits", {}).get("hits", [])
+    
+    async def semantic_search(self, index: str, embedding_field: str, 
+                       query_embedding: List[float], size: int = 10,
+                       k: Optional[int] = None, num_candidates: Optional[int] = None,
+                       filter: Optional[Union[Dict, List[Dict]]] = None,
+                       exact: bool = False, source_includes: Optional[List[str]] = None,
+                       source_excludes: Optional[List[str]] = None) -> List[Dict]:
+        """Perform semantic search using knn search
+        
+        `filter` is applied inside the kNN clause (pre-filtering), so the
+        k nearest neighbours are taken among matching documents only.
+        exact=True scores every document matching `filter` by cosine
+        similarity instead of walking the HNSW graph; it requires a filter
+        and is only used when asked for.
+        """
+        if exact:
+            if not filter:
+                raise ValueError("Exact vector search needs a filter to bound the documents scanned")
             query = {
                 "size": size,
-                "knn": {
-                    "field": embedding_field,
-                    "query_vector": query_embedding,
-                    "k": size,
-                    "num_candidates": size * 2
-                },
-                "_source": True
-            }
-            
-            try:
-                response = self.client.search(index=index, body=query)
-                return [hit for hit in response["hits"]["hits"]]
-            except:
-                query = {
-                    "size": size,
-                    "query": {
-                        "script_score": {
-                            "query": {"match_all": {}},
-                            "script": {
-                                "source": """
-                                    double value = dotProduct(params.query_vector, doc[params.field]);
-                                    return sigmoid(1, Math.E, -value);
-                                """,
-                                "params": {
-                                    "field": embedding_field,
-                                    "query_vector": query_embedding
-                                }
+                "query": {
+                    "script_score": {
+                        "query": {"bool": {"filter": filter}},
+                        "script": {
+                            "source": "cosineSimilarity(params.query_vector, params.field) + 1.0",
+                            "params": {
+                                "field": embedding_field,
+                                "query_vector": query_embedding
                             }
                         }
-                    },
-                    "_source": True
-                }
-                
-                response = self.client.search(index=index, body=query)
-                return [hit for hit in response["hits"]["hits"]]
-                
+                    }
+                },
+                "_source": self._source_filter(source_includes, source_excludes)
+            }
+        else:
+            query = {
+                "size": size,
+                "knn": self._build_knn(embedding_field, query_embedding, size,
+                                       k=k, num_candidates=num_candidates, filter=filter),
+                "_source": self._source_filter(source_includes, source_excludes)
+            }
+        
+        try:
+            response = await self._search(query, HIT_FILTER_PATH, index=index)
+            return self._hits(response)
         except Exception as e:
+            metrics.increment("es_fallback", kind="exact" if exact else "knn")
             logger.error(f"Semantic search error: {e}")
             return []
     
-    def keyword_search(self, index: str, fields: List[str], 
-                      keywords: List[str], size: int = 10) -> List[Dict]:
+    def _build_keyword_query(self, fields: List[str], keywords: List[str],
+                             filter: Optional[Union[Dict, List[Dict]]] = None) -> Optional[Dict]:
+        """Bool query of fuzzy per-keyword matches plus a phrase clause;
+        `filter` clauses restrict the candidates without affecting BM25"""
+        cleaned_keywords = []
+        for keyword in keywords:
+            cleaned = re.sub(r'[^\w\s-]', '', str(keyword)).strip()
+            if cleaned and len(cleaned) > 1:
+                cleaned_keywords.append(cleaned)
+        
+        if not cleaned_keywords:
+            return None
+        
+        should_clauses = []
+        
+        for keyword in cleaned_keywords[:10]:
+            should_clauses.append({
+                "multi_match": {
+                    "query": keyword,
+                    "fields": fields,
+                    "type": "best_fields",
+                    "fuzziness": "AUTO"
+                }
+            })
+        
+        if len(cleaned_keywords) > 1:
+            should_clauses.append({
+                "multi_match": {
+                    "query": " ".join(cleaned_keywords[:5]),
+                    "fields": fields,
+                    "type": "phrase",
+                    "slop": 2
+                }
+            })
+        
+        query = {
+            "bool": {
+                "should": should_clauses,
+                "minimum_should_match": 1
+            }
+        }
+        if filter:
+            query["bool"]["filter"] = filter
+        return query
+    
+    def _build_knn(self, embedding_field: str, query_embedding: List[float], size: int,
+                   k: Optional[int] = None, num_candidates: Optional[int] = None,
+                   filter: Optional[Union[Dict, List[Dict]]] = None) -> Dict:
+        """kNN clause; HNSW recall depends on num_candidates, so it defaults to
+        a generous multiple of k rather than tracking k"""
+        k = k or size
+        if num_candidates is None:
+            num_candidates = max(k * KNN_NUM_CANDIDATES_FACTOR, KNN_MIN_NUM_CANDIDATES)
+        knn = {
+            "field": embedding_field,
+            "query_vector": query_embedding,
+            "k": k,
+            "num_candidates": min(max(num_candidates, k), KNN_MAX_NUM_CANDIDATES)
+        }
+        if filter:
+            knn["filter"] = filter
+        return knn
+    
+    async def keyword_search(self, index: str, fields: List[str], 
+                      keywords: List[str], size: int = 10,
+                      source_includes: Optional[List[str]] = None,
+                      source_excludes: Optional[List[str]] = None,
+                      filter: Optional[Union[Dict, List[Dict]]] = None) -> List[Dict]:
         """Perform keyword search across multiple fields"""
+        source = self._source_filter(source_includes, source_excludes)
         try:
-            cleaned_keywords = []
-            for keyword in keywords:
-                cleaned = re.sub(r'[^\w\s-]', '', str(keyword)).strip()
-                if cleaned and len(cleaned) > 1:
-                    cleaned_keywords.append(cleaned)
+            keyword_query = self._build_keyword_query(fields, keywords, filter)
             
-            if not cleaned_keywords:
+            if keyword_query is None:
                 logger.warning("No valid keywords after cleaning")
                 return []
             
-            should_clauses = []
-            
-            for keyword in cleaned_keywords[:10]:
-                should_clauses.append({
-                    "multi_match": {
-                        "query": keyword,
-                        "fields": fields,
-                        "type": "best_fields",
-                        "fuzziness": "AUTO"
-                    }
-                })
-            
-            if len(cleaned_keywords) > 1:
-                should_clauses.append({
-                    "multi_match": {
-                        "query": " ".join(cleaned_keywords[:5]),
-                        "fields": fields,
-                        "type": "phrase",
-                        "slop": 2
-                    }
-                })
-            
             query = {
                 "size": size,
-                "query": {
-                    "bool": {
-                        "should": should_clauses,
-                        "minimum_should_match": 1
-                    }
-                }
+                "query": keyword_query,
+                "_source": source
             }
             
-            response = self.client.search(index=index, body=query)
-            return [hit for hit in response["hits"]["hits"]]
+            response = await self._search(query, HIT_FILTER_PATH, index=index)
+            return self._hits(response)
             
         except Exception as e:
+            metrics.increment("es_fallback", kind="keyword")
             logger.error(f"Keyword search error: {e}")
             try:
                 simple_query = {
                     "size": size,
                     "query": {
-                        "multi_match": {
-                            "query": " ".join(keywords[:3]) if keywords else "expert",
-                            "fields": fields if fields else ["description", "topic", "name"]
+                        "bool": {
+                            "must": {
+                                "multi_match": {
+                                    "query": " ".join(keywords[:3]) if keywords else "expert",
+                                    "fields": fields if fields else ["description", "topic", "name"]
+                                }
+                            },
+                            "filter": filter or []
                         }
-                    }
+                    },
+                    "_source": source
                 }
-                response = self.client.search(index=index, body=simple_query)
-                return [hit for hit in response["hits"]["hits"]]
+                response = await self._search(simple_query, HIT_FILTER_PATH, index=index)
+                return self._hits(response)
             except Exception as fallback_error:
                 logger.error(f"Fallback search also failed: {fallback_error}")
                 return []
     
-    def hybrid_search(self, index: str, embedding_field: str, 
+    async def hybrid_search(self, index: str, embedding_field: str, 
                      query_embedding: List[float], text_fields: List[str],
-                     keywords: List[str], size: int = 10) -> List[Dict]:
-        """Combined semantic and keyword search"""
+                     keywords: List[str], size: int = 10,
+                     mode: str = HYBRID_SEARCH_MODE, fusion: str = HYBRID_FUSION,
+                     source_includes: Optional[List[str]] = None,
+                     source_excludes: Optional[List[str]] = None,
+                     filter: Optional[Union[Dict, List[Dict]]] = None) -> List[Dict]:
+        """Combined semantic and keyword search
+        
+        mode="native" sends one request with both `query` and `knn` and lets
+        Elasticsearch fuse them; mode="client" runs the two searches separately.
+        fusion="rrf" fuses by rank (reciprocal rank fusion), fusion="linear"
+        sums boosted raw scores (BM25 x1.2 + similarity x1.5).
+        `filter` is applied to both the BM25 query and the kNN prefilter.
+        """
+        if mode == "native" and query_embedding:
+            try:
+                return await self._native_hybrid_search(
+                    index, embedding_field, query_embedding, text_fields, keywords, size, fusion,
+                    self._source_filter(source_includes, source_excludes), filter
+                )
+            except Exception as e:
+                metrics.increment("es_fallback", kind="native_hybrid")
+                logger.error(f"Native hybrid search error, falling back to client-side fusion: {e}")
+        
         try:
-            keyword_results = self.keyword_search(index, text_fields, keywords, size * 2)
-            
-            semantic_results = []
-            if query_embedding:
-                semantic_results = self.semantic_search(index, embedding_field, query_embedding, size)
-            
-            combined_results = {}
-            
-            for hit in keyword_results:
-                doc_id = hit["_id"]
-                combined_results[doc_id] = {
-                    "hit": hit,
-                    "score": hit.get("_score", 0) * 1.2
+            return await self._client_hybrid_search(
+                index, embedding_field, query_embedding, text_fields, keywords, size, fusion,
+                source_includes, source_excludes, filter
+            )
+        except Exception as e:
+            metrics.increment("es_fallback", kind="client_hybrid")
+            logger.error(f"Hybrid search error: {e}")
+            return await self.keyword_search(index, text_fields, keywords, size,
+                                             source_includes, source_excludes, filter)
+    
+    async def _native_hybrid_search(self, index: str, embedding_field: str,
+                              query_embedding: List[float], text_fields: List[str],
+                              keywords: List[str], size: int, fusion: str, source: Dict,
+                              filter: Optional[Union[Dict, List[Dict]]] = None) -> List[Dict]:
+        body = self._build_hybrid_body(embedding_field, query_embedding, text_fields, keywords,
+                                       size, fusion, source, filter, await self.server_version())
+        response = await self._search(body, HIT_FILTER_PATH, index=index)
+        return self._hits(response)
+    
+    def _build_hybrid_body(self, embedding_field: str, query_embedding: List[float],
+                           text_fields: List[str], keywords: List[str], size: int, fusion: str,
+                           source: Dict, filter: Optional[Union[Dict, List[Dict]]] = None,
+                           server_version: tuple = (0, 0)) -> Dict:
+        """Search body with both `query` and `knn`; the RRF window parameter
+        is named for `server_version` (window_size before 8.14)"""
+        knn = self._build_knn(embedding_field, query_embedding, size, filter=filter)
+        body = {"size": size, "knn": knn, "_source": source}
+        
+        keyword_query = self._build_keyword_query(text_fields, keywords, filter)
+        if keyword_query is not None:
+            if fusion == "rrf":
+                body["query"] = keyword_query
+                body["rank"] = {
+                    "rrf": {
+                        ("rank_window_size" if server_version >= RRF_RANK_WINDOW_SIZE_SINCE
+                         else "window_size"): max(size * 2, knn["k"]),
+                        "rank_constant": RRF_RANK_CONSTANT
+                    }
                 }
-            
-            for hit in semantic_results:
+            else:
+                keyword_query["bool"]["boost"] = 1.2
+                knn["boost"] = 1.5
+                body["query"] = keyword_query
+        
+        return body
+    
+    async def multi_hybrid_search(self, index: str, embedding_fields: List[str],
+                            query_embeddings: List[List[float]], text_fields: List[str],
+                            keywords: List[str], size: int = 10,
+                            mode: str = HYBRID_SEARCH_MODE, fusion: str = HYBRID_FUSION,
+                            source_includes: Optional[List[str]] = None,
+                            source_excludes: Optional[List[str]] = None,
+                            filter: Optional[Union[Dict, List[Dict]]] = None) -> List[Dict]:
+        """Run every (query embedding x embedding field) hybrid search and
+        return the hits of all of them
+        
+        The BM25 query is the same for every variant and field, so it runs
+        once; each kNN search is fused with its results client-side, as
+        _client_hybrid_search does. mode="native" sends all searches in a
+        single _msearch round-trip, mode="client" as concurrent requests.
+        """
+        plan = [(field, embedding) for embedding in query_embeddings for field in embedding_fields]
+        if not plan:
+            return []
+        
+        source = self._source_filter(source_includes, source_excludes)
+        keyword_query = self._build_keyword_query(text_fields, keywords, filter)
+        # (request body, equivalent standalone search) per sub-search
+        subsearches = []
+        if keyword_query is not None:
+            subsearches.append((
+                {"size": size * 2, "query": keyword_query, "_source": source},
+                lambda: self.keyword_search(index, text_fields, keywords, size * 2,
+                                            source_includes, source_excludes, filter)
+            ))
+        for field, embedding in plan:
+            subsearches.append((
+                {"size": size, "knn": self._build_knn(field, embedding, size, filter=filter), "_source": source},
+                lambda field=field, embedding=embedding: self.semantic_search(
+                    index, field, embedding, size, filter=filter,
+                    source_includes=source_includes, source_excludes=source_excludes
+                )
+            ))
+        
+        results = [None] * len(subsearches)
+        if mode == "native":
+            try:
+                responses = await self._msearch(
+                    [entry for body, _ in subsearches for entry in ({"index": index}, body)]
+                )
+                results = [None if "error" in response else self._hits(response) for response in responses]
+                for response in responses:
+                    if "error" in response:
+                        metrics.increment("es_fallback", kind="msearch")
+                        logger.warning(f"Sub-search failed: {response['error']}")
+            except Exception as e:
+                metrics.increment("es_fallback", kind="msearch")
+                logger.error(f"Multi search error, running sub-searches separately: {e}")
+        
+        # Failed sub-searches (or all of them in client mode) overlap on the pool
+        pending = [i for i, hits in enumerate(results) if hits is None]
+        for i, hits in zip(pending, await asyncio.gather(*[subsearches[i][1]() for i in pending])):
+            results[i] = hits
+        
+        keyword_results = results.pop(0) if keyword_query is not None else []
+        return [
+            hit for semantic_results in results
+            for hit in self._fuse_ranked(keyword_results, semantic_results, size, fusion)
+        ]
+    
+    async def _client_hybrid_search(self, index: str, embedding_field: str,
+                              query_embedding: List[float], text_fields: List[str],
+                              keywords: List[str], size: int, fusion: str,
+                              source_includes: Optional[List[str]] = None,
+                              source_excludes: Optional[List[str]] = None,
+                              filter: Optional[Union[Dict, List[Dict]]] = None) -> List[Dict]:
+        keyword_results = await self.keyword_search(
+            index, text_fields, keywords, size * 2,
+            source_includes=source_includes, source_excludes=source_excludes, filter=filter
+        )
+        
+        semantic_results = []
+        if query_embedding:
+            semantic_results = await self.semantic_search(
+                index, embedding_field, query_embedding, size, filter=filter,
+                source_includes=source_includes, source_excludes=source_excludes
+            )
+        
+        return self._fuse_ranked(keyword_results, semantic_results, size, fusion)
+    
+    @staticmethod
+    def _fuse_ranked(keyword_results: List[Dict], semantic_results: List[Dict],
+                     size: int, fusion: str) -> List[Dict]:
+        """Top `size` hits of both result lists by RRF or weighted score sum"""
+        combined_results = {}
+        
+        for weight, results in ((1.2, keyword_results), (1.5, semantic_results)):
+            for rank, hit in enumerate(results, 1):
+                if fusion == "rrf":
+                    contribution = 1.0 / (RRF_RANK_CONSTANT + rank)
+                else:
+                    contribution = hit.get("_score", 0) * weight
+                
                 doc_id = hit["_id"]
                 if doc_id in combined_results:
-                    combined_results[doc_id]["score"] += hit.get("_score", 0) * 1.5
+                    combined_results[doc_id]["score"] += contribution
                 else:
                     combined_results[doc_id] = {
                         "hit": hit,
-                        "score": hit.get("_score", 0) * 1.5
+                        "score": contribution
                     }
-            
-            sorted_results = sorted(
-                combined_results.values(), 
-                key=lambda x: x["score"], 
-                reverse=True
-            )[:size]
-            
-            return [result["hit"] for result in sorted_results]
-            
+        
+        sorted_results = sorted(
+            combined_results.values(), 
+            key=lambda x: x["score"], 
+            reverse=True
+        )[:size]
+        
+        return [result["hit"] for result in sorted_results]
+    
+    async def get_by_ids(self, index: str, ids: List[int],
+                         source_includes: Optional[List[str]] = None,
+                         source_excludes: Optional[List[str]] = None) -> List[Dict]:
+        """Get documents by their `id` field, in the order given.
+        
+        Expert documents are indexed with _id == id (expert_data/indexing.py),
+        so one _mget normally fetches them all. Ids it does not find, or finds
+        under a document whose `id` differs, are looked up with a `terms`
+        query on `id`, so a document indexed under another _id is not lost.
+        """
+        if not ids:
+            return []
+        
+        source = self._source_filter(source_includes, source_excludes)
+        if "includes" in source and "id" not in source["includes"]:
+            source["includes"] = source["includes"] + ["id"]
+        
+        by_id = {}
+        try:
+            response = await self.client.mget(
+                index=index,
+                ids=[str(doc_id) for doc_id in ids],
+                source_includes=source.get("includes"),
+                source_excludes=source["excludes"],
+                filter_path=MGET_FILTER_PATH
+            )
+            body = getattr(response, "body", response)
+            for doc_id, doc in zip(ids, body.get("docs", [])):
+                if doc.get("found") and doc.get("_source", {}).get("id") == doc_id:
+                    by_id[doc_id] = doc
         except Exception as e:
-            logger.error(f"Hybrid search error: {e}")
-            return self.keyword_search(index, text_fields, keywords, size)
+            logger.error(f"Get by IDs error: {e}")
+        
+        missing = [doc_id for doc_id in ids if doc_id not in by_id]
+        if missing:
+            try:
+                query = {"size": len(missing), "query": {"terms": {"id": missing}}, "_source": source}
+                response = await self._search(query, HIT_FILTER_PATH, index=index)
+                hits = self._hits(response)
+                if hits:
+                    metrics.increment("es_fallback", kind="ids_terms_lookup")
+                    logger.warning(f"{len(hits)} documents in {index} are not indexed under _id == id")
+                for hit in hits:
+                    by_id.setdefault(hit["_source"].get("id"), hit)
+            except Exception as e:
+                logger.error(f"Get by IDs terms lookup error: {e}")
+        
+        return [by_id[doc_id] for doc_id in ids if doc_id in by_id]
     
-    def get_by_ids(self, index: str, ids: List[int]) -> List[Dict]:
-        """Get documents by IDs"""
+    async def filter_ids(self, index: str, ids: List[int], filter: List[Dict]) -> List[int]:
+        """Those of `ids` (the `id` field) whose documents match every `filter`
+        clause, in the order given; all of `ids` if the lookup fails"""
+        if not ids or not filter:
+            return list(ids)
         try:
-            if not ids:
-                return []
-            
-            query = {
-                "query": {
-                    "terms": {"id": ids}
-                }
+            body = {
+                "size": len(ids),
+                "query": {"bool": {"filter": [{"terms": {"id": list(ids)}}] + list(filter)}},
+                "_source": ["id"]
             }
-            response = self.client.search(index=index, body=query, size=len(ids))
-            return [hit for hit in response["hits"]["hits"]]
+            response = await self._search(body, HIT_FILTER_PATH, index=index)
+            matching = {hit["_source"]["id"] for hit in self._hits(response)}
+            return [doc_id for doc_id in ids if doc_id in matching]
         except Exception as e:
-            logger.error(f"Get by IDs error: {e}")
-            return []
+            metrics.increment("es_fallback", kind="filter_ids")
+            logger.error(f"Filter by IDs error: {e}")
+            return list(ids)
     
-    def get_recent_documents(self, index: str, field: str = "@timestamp", 
-                           size: int = 100) -> List[Dict]:
+    async def get_recent_documents(self, index: str, field: str = "@timestamp", 
+                           size: int = 100, source_includes: Optional[List[str]] = None,
+                           source_excludes: Optional[List[str]] = None) -> List[Dict]:
         """Get recent documents from index"""
+        source = self._source_filter(source_includes, source_excludes)
         try:
             query = {
                 "size": size,
                 "sort": [{field: {"order": "desc"}}],
-                "query": {"match_all": {}}
+                "query": {"match_all": {}},
+                "_source": source
             }
-            response = self.client.search(index=index, body=query)
-            return [hit for hit in response["hits"]["hits"]]
+            response = await self._search(query, HIT_FILTER_PATH, index=index)
+            return self._hits(response)
         except:
             # Fallback without timestamp
             query = {
                 "size": size,
-                "query": {"match_all": {}}
+                "query": {"match_all": {}},
+                "_source": source
             }
-            response = self.client.search(index=index, body=query)
-            return [hit for hit in response["hits"]["hits"]]
+            response = await self._search(query, HIT_FILTER_PATH, index=index)
+            return self._hits(response)
+    
+    async def iter_search(self, index: str, query: Dict, sort: Optional[List[Dict]] = None,
+                          page_size: int = ES_PAGE_SIZE, max_hits: Optional[int] = None,
+                          keep_alive: str = ES_PIT_KEEP_ALIVE,
+                          source_includes: Optional[List[str]] = None,
+                          source_excludes: Optional[List[str]] = None) -> AsyncIterator[Dict]:
+        """Stream every hit of `query` page by page with search_after over a
+        point-in-time, so results stay consistent and are not capped by
+        max_result_window. Stops after `max_hits`; callers that break out
+        early should wrap the iterator in contextlib.aclosing() so the PIT
+        is released immediately.
+        """
+        pit_id = (await self.client.open_point_in_time(index=index, keep_alive=keep_alive))["id"]
+        source = self._source_filter(source_includes, source_excludes)
+        # _shard_doc is the cheapest unique tiebreaker available with a PIT
+        sort = (sort or [{"_score": "desc"}]) + [{"_shard_doc": "asc"}]
+        search_after = None
+        yielded = 0
+        try:
+            while max_hits is None or yielded < max_hits:
+                size = page_size if max_hits is None else min(page_size, max_hits - yielded)
+                body = {
+                    "size": size,
+                    "query": query,
+                    "sort": sort,
+                    "pit": {"id": pit_id, "keep_alive": keep_alive},
+                    "track_total_hits": False,
+                    "_source": source
+                }
+                if search_after is not None:
+                    body["search_after"] = search_after
+                
+                response = await self._search(body, PAGE_FILTER_PATH)
+                pit_id = getattr(response, "body", response).get("pit_id", pit_id)
+                hits = self._hits(response)
+                for hit in hits:
+                    yield hit
+                yielded += len(hits)
+                if len(hits) < size:
+                    break
+                search_after = hits[-1]["sort"]
+        finally:
+            try:
+                await self.client.close_point_in_time(id=pit_id)
+            except Exception as e:
+                logger.warning(f"Failed to close point in time: {e}")
+    
+    def iter_keyword_search(self, index: str, fields: List[str], keywords: List[str],
+                            page_size: int = ES_PAGE_SIZE, max_hits: Optional[int] = None,
+                            source_includes: Optional[List[str]] = None,
+                            source_excludes: Optional[List[str]] = None,
+                            filter: Optional[Union[Dict, List[Dict]]] = None) -> AsyncIterator[Dict]:
+        """keyword_search without the single-page limit, best matches first.
+        Like keyword_search, yields nothing when no keyword survives cleaning
+        (rather than streaming the whole index)."""
+        query = self._build_keyword_query(fields, keywords, filter)
+        if query is None:
+            return _no_hits()
+        return self.iter_search(index, query, page_size=page_size, max_hits=max_hits,
+                                source_includes=source_includes, source_excludes=source_excludes)
+    
+    def iter_recent_documents(self, index: str, field: str = "@timestamp",
+                              page_size: int = ES_PAGE_SIZE, max_hits: Optional[int] = None,
+                              source_includes: Optional[List[str]] = None,
+                              source_excludes: Optional[List[str]] = None) -> AsyncIterator[Dict]:
+        """get_recent_documents without the single-page limit, newest first"""
+        return self.iter_search(index, {"match_all": {}},
+                                sort=[{field: {"order": "desc", "unmapped_type": "date"}}],
+                                page_size=page_size, max_hits=max_hits,
+                                source_includes=source_includes, source_excludes=source_excludes)
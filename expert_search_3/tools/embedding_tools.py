@@ -1,16 +1,27 @@
 from sentence_transformers import SentenceTransformer
 import numpy as np
 from typing import List
-from config.settings import EMBEDDING_MODEL
+from config.settings import EMBEDDING_MODEL, EMBEDDING_BACKEND, ONNX_MODEL_PATH
 import logging
 
 logger = logging.getLogger(__name__)
 
 class EmbeddingGenerator:
-    def __init__(self):
+    def __init__(self, backend: str = EMBEDDING_BACKEND):
         try:
-            self.model = SentenceTransformer(EMBEDDING_MODEL)
-            logger.info(f"Loaded embedding model: {EMBEDDING_MODEL}")
+            self.model = None
+            if backend == "onnx":
+                try:
+                    from tools.onnx_encoder import OnnxSentenceEncoder
+                    self.model = OnnxSentenceEncoder(EMBEDDING_MODEL, cache_dir=ONNX_MODEL_PATH)
+                except Exception as e:
+                    # Missing onnxruntime, failed export or accuracy check: stay on PyTorch
+                    logger.error(f"ONNX embedding backend unavailable, using torch: {e}")
+                    backend = "torch"
+            if self.model is None:
+                self.model = SentenceTransformer(EMBEDDING_MODEL)
+            self.backend = backend
+            logger.info(f"Loaded embedding model: {EMBEDDING_MODEL} ({backend})")
         except Exception as e:
             logger.error(f"Error loading embedding model: {e}")
             raise
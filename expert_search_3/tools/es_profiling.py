@@ -0,0 +1,112 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Iterator
+
+logger = logging.getLogger(__name__)
+
+STRUCTURAL_KEYS = ("field", "fields", "path", "type")
+
+# Profiles recorded by the current search (and the tasks it spawns)
+_collector: ContextVar[Optional[List[Dict]]] = ContextVar("es_profile_collector", default=None)
+
+
+def query_shape(body: Any) -> Any:
+    """Request body with every literal except field names replaced by "?",
+    so the same query structure with different keywords/vectors groups together"""
+    if isinstance(body, dict):
+        return {
+            k: "<vector>" if k == "query_vector" else v if k in STRUCTURAL_KEYS else query_shape(v)
+            for k, v in body.items()
+        }
+    if isinstance(body, list):
+        return [query_shape(v) for v in body]
+    return "?"
+
+
+def shape_id(shape: Any) -> str:
+    return hashlib.md5(json.dumps(shape, sort_keys=True).encode()).hexdigest()[:10]
+
+
+def _clause_name(node: Dict) -> str:
+    return f"{node.get('type', '?')}: {node.get('description', '')[:80]}"
+
+
+def clause_timings(profile: Optional[Dict]) -> Dict[str, float]:
+    """Milliseconds per top-level query clause and its direct children,
+    summed over shards; kNN (dfs phase) is reported as "knn: <field>"."""
+    timings: Dict[str, float] = defaultdict(float)
+    for shard in (profile or {}).get("shards", []):
+        for search in shard.get("searches", []):
+            for node in search.get("query", []):
+                timings[_clause_name(node)] += node.get("time_in_nanos", 0) / 1e6
+                for child in node.get("children", []):
+                    timings["  " + _clause_name(child)] += child.get("time_in_nanos", 0) / 1e6
+        for knn in shard.get("dfs", {}).get("knn", []):
+            for node in knn.get("query", []):
+                timings[f"knn: {node.get('description', '')[:80]}"] += node.get("time_in_nanos", 0) / 1e6
+    return {name: round(ms, 3) for name, ms in timings.items()}
+
+
+def build_record(index: Optional[str], body: Dict, response: Dict, wall_ms: float) -> Dict[str, Any]:
+    shape = query_shape({k: v for k, v in body.items() if k not in ("profile", "pit", "search_after")})
+    return {
+        "ts": time.time(),
+        "index": index,
+        "shape_id": shape_id(shape),
+        "shape": shape,
+        "took_ms": response.get("took"),
+        "wall_ms": round(wall_ms, 1),
+        "clauses": clause_timings(response.get("profile"))
+    }
+
+
+def record(entry: Dict[str, Any], slow_log_path: str, threshold_ms: float):
+    """Hand the profile to the active collector and append it to the
+    slow-query log when Elasticsearch took at least `threshold_ms`"""
+    collected = _collector.get()
+    if collected is not None:
+        collected.append(entry)
+
+    took = entry.get("took_ms")
+    if took is None or took < threshold_ms:
+        return
+    try:
+        os.makedirs(os.path.dirname(slow_log_path) or ".", exist_ok=True)
+        with open(slow_log_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError as e:
+        logger.error(f"Error writing slow query log: {e}")
+
+
+@contextmanager
+def collect_profiles() -> Iterator[List[Dict]]:
+    """Collect the profiles of every request made inside the block"""
+    profiles: List[Dict] = []
+    token = _collector.set(profiles)
+    try:
+        yield profiles
+    finally:
+        _collector.reset(token)
+
+
+def summarize(profiles: List[Dict], top: int = 3) -> List[str]:
+    """Short reasoning-trace lines: request count, time and hottest clauses"""
+    if not profiles:
+        return []
+    took = sum(p.get("took_ms") or 0 for p in profiles)
+    clauses: Dict[str, float] = defaultdict(float)
+    for p in profiles:
+        for name, ms in p.get("clauses", {}).items():
+            if not name.startswith("  "):
+                clauses[name] += ms
+
+    lines = [f"- Elasticsearch: {len(profiles)} queries, {took}ms server time"]
+    for name, ms in sorted(clauses.items(), key=lambda x: x[1], reverse=True)[:top]:
+        lines.append(f"  - {ms:.1f}ms in {name}")
+    return lines
@@ -0,0 +1,171 @@
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from config.settings import (
+    LLM_MAX_CONCURRENCY, LLM_DEADLINE, LLM_BREAKER_FAILURE_THRESHOLD, LLM_BREAKER_RESET_TIMEOUT
+)
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """The LLM backend is considered unhealthy; the call was not attempted"""
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds, then lets a single probe through (half-open):
+    success closes the circuit, failure opens it again."""
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = LLM_BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("LLM backend recovered, closing circuit")
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def abandon(self):
+        """An allowed call ended without an outcome (cancelled or never sent)"""
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self._probing:
+                logger.warning(f"LLM backend failing ({self.failures} consecutive), opening circuit "
+                               f"for {self.reset_timeout}s")
+                metrics.increment("llm_scheduler", event="circuit_opened")
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+
+class LLMScheduler:
+    """Client-side admission control for the single LLM backend.
+
+    - at most `max_concurrency` requests are sent at once, the rest wait;
+    - identical in-flight requests (same key) share one backend call, which is
+      cancelled once every caller waiting on it has given up;
+    - every call, including its wait for a slot, is bounded by a deadline;
+    - a circuit breaker rejects calls immediately while the backend is failing.
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, breaker: Optional[CircuitBreaker] = None):
+        self.max_concurrency = max_concurrency
+        self.breaker = breaker or CircuitBreaker()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self.active = 0
+        self.waiting = 0
+
+    async def run(self, call: Callable[[], Awaitable[Any]], key: Optional[Hashable] = None,
+                  deadline: float = LLM_DEADLINE) -> Any:
+        """Result of `call()`; raises CircuitOpenError, asyncio.TimeoutError
+        (deadline passed) or whatever `call` raised"""
+        shared = self._inflight.get(key) if key is not None else None
+        if shared is not None:
+            metrics.increment("llm_scheduler", event="coalesced")
+            return await self._wait(shared, key, timeout=deadline)
+
+        if not self.breaker.allow():
+            metrics.increment("llm_scheduler", event="circuit_rejected")
+            raise CircuitOpenError("LLM circuit open")
+
+        task = asyncio.ensure_future(self._execute(call, deadline))
+        if key is not None:
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await self._wait(task, key)
+
+    async def _wait(self, task: asyncio.Future, key: Optional[Hashable], timeout: Optional[float] = None) -> Any:
+        """Await a (possibly shared) call. Shielded so one caller giving up does
+        not cancel it for the others; the last caller to leave cancels it, so an
+        abandoned request does not hold a backend slot until its deadline."""
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    metrics.increment("llm_scheduler", event="abandoned")
+                    # No new caller may join a call that is being cancelled
+                    if key is not None and self._inflight.get(key) is task:
+                        del self._inflight[key]
+                    task.cancel()
+
+    async def _execute(self, call: Callable[[], Awaitable[Any]], deadline: float) -> Any:
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=deadline)
+        except asyncio.TimeoutError:
+            metrics.increment("llm_scheduler", event="queue_timeout")
+            self.breaker.abandon()
+            raise
+        except asyncio.CancelledError:
+            self.breaker.abandon()
+            raise
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        try:
+            result = await asyncio.wait_for(call(), timeout=deadline - (time.monotonic() - start))
+        except asyncio.TimeoutError:
+            metrics.increment("llm_scheduler", event="deadline_exceeded")
+            self.breaker.record_failure()
+            raise
+        except asyncio.CancelledError:
+            self.breaker.abandon()
+            raise
+        except Exception as e:
+            # A 4xx (e.g. an unknown model name) is a bad request, not a sick
+            # backend: it must not open the circuit for every other model
+            if 400 <= getattr(e, "status_code", 500) < 500:
+                self.breaker.abandon()
+            else:
+                self.breaker.record_failure()
+            raise
+        else:
+            self.breaker.record_success()
+            return result
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "coalescing": len(self._inflight),
+            "circuit": self.breaker.state
+        }
@@ -2,24 +2,209 @@ import httpx
 import json
 import asyncio
 import re
-from typing import List, Dict, Any, Optional, Tuple
-from config.settings import LLM_API_URL, LLM_MODEL, LLM_TIMEOUT
+import sqlite3
+import functools
+import inspect
+from contextvars import ContextVar
+from typing import List, Dict, Any, Optional, Tuple, Callable
+from config.settings import (
+    LLM_API_URL, LLM_MODEL, LLM_TIMEOUT, LLM_HTTP2,
+    LLM_MAX_CONNECTIONS, LLM_MAX_KEEPALIVE_CONNECTIONS, LLM_KEEPALIVE_EXPIRY, LLM_CACHE_ENABLED, LLM_STREAM,
+    EXPLANATION_CACHE_SIZE, EXPLANATION_CACHE_TTL, LLM_DEADLINE, PROMPT_TOKEN_BUDGETS,
+    LLM_SMALL_MODEL, LLM_MODEL_ROUTES, LLM_ESCALATION_CONFIDENCE
+)
 import logging
 from models.schemas import ReasoningTrace
+from storage.llm_cache import LLMResponseCache, normalize_query
+from tools.llm_scheduler import LLMScheduler, CircuitOpenError
+from tools import prompt_budget
+import time
+from utils import metrics
+from utils.cache import LRUCache
+import hashlib
 from datetime import datetime
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# One pooled connection set per process, shared by every LLMClient
+_shared_http_client: Optional[httpx.AsyncClient] = None
+_shared_cache: Optional[LLMResponseCache] = None
+# Concurrency cap, request coalescing and circuit breaker for the one LLM backend
+_shared_scheduler: Optional[LLMScheduler] = None
+# Relevance explanations keyed by (query hash, expert id)
+_explanation_cache = LRUCache(EXPLANATION_CACHE_SIZE, EXPLANATION_CACHE_TTL)
+
+# Set when an answer is not the model's own: generate() used _fallback_response,
+# or a method replaced unparseable output with heuristic defaults. Such results
+# are returned but never cached, so one bad response is not served for a week.
+_fallback_used: ContextVar[bool] = ContextVar("llm_fallback_used", default=False)
+
+
+def _create_http_client() -> httpx.AsyncClient:
+    http2 = LLM_HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("h2 not installed, using HTTP/1.1 to the LLM backend (pip install httpx[http2])")
+            http2 = False
+    return httpx.AsyncClient(
+        verify=False,
+        timeout=LLM_TIMEOUT,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+        )
+    )
+
+
+class LLMBackendError(Exception):
+    """The LLM API answered with a non-200 status"""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"{status_code} - {text}")
+        self.status_code = status_code
+
+
+def _get_shared_scheduler() -> LLMScheduler:
+    global _shared_scheduler
+    if _shared_scheduler is None:
+        _shared_scheduler = LLMScheduler()
+    return _shared_scheduler
+
+
+def _get_shared_cache() -> Optional[LLMResponseCache]:
+    global _shared_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _shared_cache is None:
+        try:
+            _shared_cache = LLMResponseCache()
+        except sqlite3.Error as e:
+            logger.error(f"Error opening LLM response cache: {e}")
+            return None
+    return _shared_cache
+
+
+def _cached_call(template: str, semantic: bool = True):
+    """Serve a query-level `(result, reasoning)` method from the response
+    cache, keyed on the model, `template`, the query and the other arguments.
+    `semantic=False` keeps the method out of near-duplicate reuse, for answers
+    that carry query-specific constraints (locations, years, functions)."""
+    def decorator(method):
+        signature = inspect.signature(method)
+        
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items() if k not in ("self", "query")}
+            return await self._cached(template, bound.arguments["query"], params,
+                                      lambda: method(self, *args, **kwargs), semantic=semantic)
+        return wrapper
+    return decorator
+
+
 class LLMClient:
-    def __init__(self):
+    # Part of every cache key; bump when a cached prompt's wording or output format changes
+    PROMPT_VERSION = 2
+    
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None,
+                 cache: Optional[LLMResponseCache] = None,
+                 embedder: Optional[Callable[[str], List[float]]] = None,
+                 on_reasoning_token: Optional[Callable[[str], None]] = None,
+                 scheduler: Optional[LLMScheduler] = None):
         self.api_url = LLM_API_URL
         self.model = LLM_MODEL
+        self.small_model = LLM_SMALL_MODEL
         self.timeout = LLM_TIMEOUT
+        # Total time per call, including the wait for a backend slot
+        self.deadline = LLM_DEADLINE
+        self.scheduler = scheduler or _get_shared_scheduler()
+        self._http_client = http_client
+        self.cache = cache if cache is not None else _get_shared_cache()
+        # Query embedding function for the cache's semantic layer (optional)
+        self.embedder = embedder
+        # Receives reasoning tokens while generate_with_reasoning streams (e.g. to print them live)
+        self.on_reasoning_token = on_reasoning_token
+    
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Long-lived keep-alive client; the process-wide pool unless one was injected"""
+        global _shared_http_client
+        if self._http_client is not None:
+            return self._http_client
+        if _shared_http_client is None or _shared_http_client.is_closed:
+            _shared_http_client = _create_http_client()
+        return _shared_http_client
+    
+    async def aclose(self):
+        """Close the connection pool this client uses (call once on shutdown)"""
+        global _shared_http_client
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        elif _shared_http_client is not None:
+            await _shared_http_client.aclose()
+            _shared_http_client = None
     
-    async def generate_with_reasoning(self, prompt: str, stream: bool = False) -> Tuple[str, str]:
-        """Generate text with explicit reasoning"""
-        reasoning_prompt = f"""
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+    
+    async def _cached(self, template: str, query: str, params: Dict[str, Any], compute, semantic: bool = True):
+        """Cached result of `compute()`; results built from the fallback response
+        (LLM unavailable) or from heuristic defaults (unparseable output) are
+        returned but not stored"""
+        if self.cache is None:
+            return await compute()
+        
+        model = self.model_for(template)
+        template_id = f"{template}@v{self.PROMPT_VERSION}"
+        embedding = None
+        try:
+            value = self.cache.get(model, template_id, query, params)
+            result = "hit"
+            if value is None and semantic and self.embedder is not None and self.cache.semantic_enabled:
+                # The embedding model runs on CPU; keep it off the event loop
+                embedding = await asyncio.to_thread(self.embedder, normalize_query(query))
+                value = self.cache.get_similar(model, template_id, query, params, embedding)
+                result = "semantic_hit"
+        except (sqlite3.Error, ValueError) as e:
+            logger.error(f"Error reading LLM cache: {e}")
+            return await compute()
+        
+        if value is not None:
+            self.cache.record(result)
+            metrics.increment("llm_cache", template=template, result=result)
+            return tuple(value)
+        self.cache.record("miss")
+        metrics.increment("llm_cache", template=template, result="miss")
+        
+        token = _fallback_used.set(False)
+        try:
+            result = await compute()
+            if not _fallback_used.get():
+                self.cache.put(model, template_id, query, params, list(result), embedding)
+        finally:
+            _fallback_used.reset(token)
+        return result
+    
+    async def generate_with_reasoning(self, prompt: str, stream: bool = LLM_STREAM,
+                                      reasoning: bool = True, template: str = "generic",
+                                      model: Optional[str] = None) -> Tuple[str, str]:
+        """Generate text with explicit reasoning.
+        
+        Streamed responses stop as soon as the closing </answer> arrives, and
+        reasoning tokens are passed to `on_reasoning_token` while they stream.
+        With reasoning=False the model is asked for the answer only.
+        """
+        if reasoning:
+            reasoning_prompt = f"""
 {prompt}
 
 Please think step-by-step before providing your final answer. Show your reasoning process.
@@ -32,68 +217,259 @@ Format your response as:
 [Your final answer here]
 </answer>
 """
+        else:
+            reasoning_prompt = f"""
+{prompt}
+
+Do not explain your reasoning. Respond with only the final answer in this format:
+<answer>
+[Your final answer here]
+</answer>
+"""
+        think = None if reasoning else False
         
-        full_response = await self.generate(reasoning_prompt, stream)
+        if stream:
+            answer_started = False
+            
+            def forward(chunk: str, text: str):
+                nonlocal answer_started
+                answer_started = answer_started or "<answer>" in self._strip_think(text)
+                if not answer_started and self.on_reasoning_token:
+                    self.on_reasoning_token(chunk)
+            
+            full_response = await self.generate_stream(
+                reasoning_prompt, think=think, stop_when=self._answer_complete,
+                on_token=forward if reasoning else None, template=template, model=model
+            )
+        else:
+            full_response = await self.generate(reasoning_prompt, think=think, template=template, model=model)
         
-        reasoning = ""
+        thinking = ""
+        think_match = re.search(r'<think>(.*?)</think>', full_response, re.DOTALL)
+        if think_match:
+            thinking = think_match.group(1).strip()
+        full_response = self._strip_think(full_response)
+        
+        reasoning_text = ""
         answer = ""
         
         if "<reasoning>" in full_response and "</reasoning>" in full_response:
             reasoning_match = re.search(r'<reasoning>(.*?)</reasoning>', full_response, re.DOTALL)
             if reasoning_match:
-                reasoning = reasoning_match.group(1).strip()
+                reasoning_text = reasoning_match.group(1).strip()
         
         if "<answer>" in full_response and "</answer>" in full_response:
             answer_match = re.search(r'<answer>(.*?)</answer>', full_response, re.DOTALL)
             if answer_match:
                 answer = answer_match.group(1).strip()
+            if not reasoning_text:
+                reasoning_text = thinking if reasoning else "Answer requested without reasoning"
         else:
             answer = full_response
-            reasoning = "Direct response without explicit reasoning"
+            reasoning_text = "Direct response without explicit reasoning"
         
-        return answer, reasoning
+        return answer, reasoning_text
+    
+    def model_for(self, template: str) -> str:
+        """Model the routing table assigns to a prompt template"""
+        route = LLM_MODEL_ROUTES.get(template, "large")
+        return self.small_model if route == "small" and self.small_model else self.model
     
-    async def generate(self, prompt: str, stream: bool = False) -> str:
-        """Original generate method"""
+    async def _escalating(self, template: str, attempt: Callable[[str], Any], confident: Callable[[Any], bool]):
+        """`await attempt(model)` on the routed model; if that was the small model
+        and it failed or `confident(result)` is false, retry on the large model"""
+        model = self.model_for(template)
+        token = _fallback_used.set(False)
         try:
-            async with httpx.AsyncClient(verify=False, timeout=self.timeout) as client:
-                payload = {
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": stream
-                }
-                
-                logger.info(f"Sending request to LLM: {self.api_url}")
-                response = await client.post(self.api_url, json=payload)
-                
+            result = await attempt(model)
+            failed = _fallback_used.get()
+        finally:
+            _fallback_used.reset(token)
+        
+        if model != self.model and (failed or not confident(result)):
+            logger.info(f"Escalating {template} from {model} to {self.model}")
+            metrics.increment("llm_escalation", template=template)
+            return await attempt(self.model)
+        if failed:
+            _fallback_used.set(True)
+        return result
+    
+    def _payload(self, prompt: str, stream: bool, format: Optional[str], think: Optional[bool],
+                 model: str) -> Dict[str, Any]:
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": stream
+        }
+        if format:
+            payload["format"] = format
+        if think is not None:
+            # Thinking models (e.g. deepseek-r1) skip their <think> phase when False
+            payload["think"] = think
+        return payload
+    
+    async def generate(self, prompt: str, stream: bool = False, format: Optional[str] = None,
+                       think: Optional[bool] = None, template: str = "generic",
+                       model: Optional[str] = None) -> str:
+        """Original generate method; format="json" makes Ollama emit valid JSON only.
+        `template` names the prompt in token/latency metrics and picks the model
+        from LLM_MODEL_ROUTES unless `model` is given."""
+        if stream:
+            return await self.generate_stream(prompt, format=format, think=think, template=template, model=model)
+        payload = self._payload(prompt, False, format, think, model or self.model_for(template))
+        # Identical prompts already in flight share one backend call
+        key = json.dumps(payload, sort_keys=True)
+        return await self._scheduled(prompt, template, key, lambda: self._post(payload, template))
+    
+    async def _post(self, payload: Dict[str, Any], template: str) -> str:
+        logger.info(f"Sending request to LLM: {self.api_url}")
+        start = time.perf_counter()
+        response = await self.http.post(self.api_url, json=payload, timeout=self.timeout)
+        if response.status_code != 200:
+            raise LLMBackendError(response.status_code, response.text)
+        data = response.json()
+        self._record_usage(template, payload, start, data)
+        return data.get("response", "")
+    
+    def _record_usage(self, template: str, payload: Dict[str, Any], start: float, final: Dict[str, Any],
+                      streamed_chunks: int = 0):
+        """Latency and token histograms per template and model. Token counts come from
+        Ollama's prompt_eval_count/eval_count; a stream stopped early has no
+        final counts, so its prompt is estimated and each chunk counts as a token."""
+        prompt, model = payload["prompt"], payload["model"]
+        prompt_tokens = final.get("prompt_eval_count")
+        if prompt_tokens:
+            prompt_budget.calibrate(len(prompt), prompt_tokens)
+        else:
+            prompt_tokens = prompt_budget.estimate_tokens(prompt)
+        completion_tokens = final.get("eval_count") or streamed_chunks
+        
+        metrics.observe("llm_latency_ms", (time.perf_counter() - start) * 1000, template=template, model=model)
+        metrics.observe("llm_prompt_tokens", prompt_tokens, metrics.TOKEN_BUCKETS, template=template, model=model)
+        metrics.observe("llm_completion_tokens", completion_tokens, metrics.TOKEN_BUCKETS,
+                        template=template, model=model)
+        metrics.increment("llm_tokens", prompt_tokens, template=template, kind="prompt")
+        metrics.increment("llm_tokens", completion_tokens, template=template, kind="completion")
+    
+    async def _scheduled(self, prompt: str, template: str, key: Optional[str], call) -> str:
+        """Run `call` through the scheduler; any failure, a passed deadline or an
+        open circuit answers with the fallback response"""
+        if template in PROMPT_TOKEN_BUDGETS and prompt_budget.estimate_tokens(prompt) > PROMPT_TOKEN_BUDGETS[template]:
+            metrics.increment("llm_prompt_over_budget", template=template)
+        try:
+            return await self.scheduler.run(call, key=key, deadline=self.deadline)
+        except CircuitOpenError:
+            logger.warning("LLM circuit open, using fallback response")
+        except asyncio.TimeoutError:
+            logger.error(f"LLM call exceeded its {self.deadline}s deadline")
+        except LLMBackendError as e:
+            logger.error(f"LLM API error: {e}")
+        except Exception as e:
+            logger.error(f"Error calling LLM API: {e}")
+        _fallback_used.set(True)
+        return self._fallback_response(prompt)
+    
+    async def generate_stream(self, prompt: str, format: Optional[str] = None, think: Optional[bool] = None,
+                              stop_when: Optional[Callable[[str], bool]] = None,
+                              on_token: Optional[Callable[[str, str], None]] = None,
+                              template: str = "generic", model: Optional[str] = None) -> str:
+        """Stream the completion token by token. `on_token(chunk, text_so_far)`
+        sees every chunk (including separate "thinking" chunks); once
+        `stop_when(text_so_far)` is true the stream is closed, which stops the
+        generation on the server, and the text so far is returned."""
+        payload = self._payload(prompt, True, format, think, model or self.model_for(template))
+        # Streams watched by a token callback are never shared with other callers
+        key = None if on_token else json.dumps([payload, getattr(stop_when, "__qualname__", None)], sort_keys=True)
+        return await self._scheduled(prompt, template, key,
+                                     lambda: self._stream(payload, stop_when, on_token, template))
+    
+    async def _stream(self, payload: Dict[str, Any], stop_when: Optional[Callable[[str], bool]],
+                      on_token: Optional[Callable[[str, str], None]], template: str) -> str:
+        text = ""
+        chunks = 0
+        final: Dict[str, Any] = {}
+        start = time.perf_counter()
+        try:
+            logger.info(f"Streaming request to LLM: {self.api_url}")
+            async with self.http.stream("POST", self.api_url, json=payload, timeout=self.timeout) as response:
                 if response.status_code != 200:
-                    logger.error(f"LLM API error: {response.status_code} - {response.text}")
-                    return self._fallback_response(prompt)
+                    await response.aread()
+                    raise LLMBackendError(response.status_code, response.text)
                 
-                if stream:
-                    full_response = ""
-                    async for line in response.aiter_lines():
-                        if line:
-                            try:
-                                data = json.loads(line)
-                                if "response" in data:
-                                    full_response += data["response"]
-                            except json.JSONDecodeError:
-                                continue
-                    return full_response
-                else:
-                    return response.json().get("response", "")
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    try:
+                        data = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
                     
-        except Exception as e:
-            logger.error(f"Error calling LLM API: {e}")
-            return self._fallback_response(prompt)
+                    if data.get("thinking"):
+                        chunks += 1
+                        if on_token:
+                            on_token(data["thinking"], text)
+                    chunk = data.get("response", "")
+                    if chunk:
+                        chunks += 1
+                        text += chunk
+                        if on_token:
+                            on_token(chunk, text)
+                        if stop_when and stop_when(text):
+                            metrics.increment("llm_stream_early_stop")
+                            break
+                    if data.get("done"):
+                        final = data
+                        break
+            self._record_usage(template, payload, start, final, chunks)
+            return text
+        
+        except Exception:
+            # Closing an abandoned stream may fail after the answer is complete
+            if text and stop_when and stop_when(text):
+                return text
+            raise
+    
+    @staticmethod
+    def _strip_think(text: str) -> str:
+        """Text after a deepseek-r1 style <think> block ("" while still thinking)"""
+        if "</think>" in text:
+            return text.split("</think>", 1)[1]
+        if "<think>" in text:
+            return ""
+        return text
+    
+    @classmethod
+    def _answer_complete(cls, text: str) -> bool:
+        return "</answer>" in cls._strip_think(text)
+    
+    @classmethod
+    def _json_complete(cls, text: str) -> bool:
+        """True once a whole JSON object has been emitted"""
+        visible = cls._strip_think(text).rstrip()
+        start = visible.find("{")
+        if start < 0 or not visible.endswith("}"):
+            return False
+        try:
+            json.JSONDecoder().raw_decode(visible[start:])
+            return True
+        except json.JSONDecodeError:
+            return False
+    
+    @classmethod
+    def _number_list_complete(cls, count: int) -> Callable[[str], bool]:
+        """Stop condition for a comma-separated ranking of `count` numbers"""
+        def complete(text: str) -> bool:
+            visible = cls._strip_think(text)
+            return len(re.findall(r'\d+', visible)) >= count and not visible[-1:].isdigit()
+        return complete
     
     async def analyze_query(self, query: str) -> Dict[str, Any]:
         """Original analyze method for backward compatibility"""
-        analysis, _ = await self.analyze_query_with_reasoning(query)
+        analysis, _ = await self.analyze_query_with_reasoning(query, reasoning=False)
         return analysis
     
-    async def analyze_query_with_reasoning(self, query: str) -> Tuple[Dict[str, Any], str]:
+    @_cached_call("analyze_query", semantic=False)
+    async def analyze_query_with_reasoning(self, query: str, reasoning: bool = True) -> Tuple[Dict[str, Any], str]:
         """Analyze query with visible reasoning"""
         prompt = f"""
 Analyze the following user query using **both expert search strategies**: 
@@ -118,6 +494,7 @@ Output a JSON object with separate analysis for both strategies:
         "expertise_areas": [],
         "geographical_focus": [],
         "experience_level": null or number,
+        "functions": [],
         "summary": "Why/how this strategy applies or doesn't apply"
     }},
     "project_based_strategy": {{
@@ -134,18 +511,17 @@ Output a JSON object with separate analysis for both strategies:
 }}
 """
         
-        response, reasoning = await self.generate_with_reasoning(prompt)
+        response, reasoning = await self.generate_with_reasoning(prompt, reasoning=reasoning, template="analyze_query")
         
         try:
             analysis = json.loads(response)
             return analysis, reasoning
         except:
-            query_lower = query.lower()
-            if any(word in query_lower for word in ["project", "agenda", "initiative", "implementing", "building"]):
-                query_type = "project_based"
+            _fallback_used.set(True)
+            query_type = self._guess_query_type(query)
+            if query_type == "project_based":
                 reasoning = "Query contains project-related keywords"
             else:
-                query_type = "direct_expert"
                 reasoning = "Query appears to be a direct search for experts"
             
             return {
@@ -154,12 +530,119 @@ Output a JSON object with separate analysis for both strategies:
                 "reasoning_summary": reasoning
             }, reasoning
     
+    @_cached_call("analyze_query_combined", semantic=False)
+    async def analyze_query_combined(self, query: str, count: int = 3) -> Tuple[Dict[str, Any], str]:
+        """Query type, constraints, enhanced queries and keywords from one
+        structured (JSON-mode) call instead of three reasoning round-trips"""
+        prompt = f"""
+Analyze this expert search query and return a single JSON object.
+
+Query: "{query}"
+
+Decide whether the user asks for an expert directly ("direct_expert") or
+describes a project/task from which the needed expert must be inferred
+("project_based"). Extract only constraints the query states explicitly.
+
+JSON schema:
+{{
+    "query_type": "direct_expert" or "project_based",
+    "key_requirements": [],
+    "expertise_areas": [],
+    "geographical_focus": [],
+    "experience_level": null or minimum years as a number,
+    "functions": [],
+    "enhanced_queries": [{count} alternative search queries capturing different aspects, synonyms or more specific phrasing],
+    "keywords": [up to 15 core technical terms and close synonyms],
+    "reasoning_summary": "one or two sentences on how the query was interpreted",
+    "confidence": number from 0 to 1, how sure you are of this interpretation
+}}
+"""
+        
+        def confident(response: str) -> bool:
+            parsed = self._parse_json_object(self._strip_think(response))
+            if not parsed or parsed.get("query_type") not in ("direct_expert", "project_based"):
+                return False
+            try:
+                return float(parsed.get("confidence", 1.0)) >= LLM_ESCALATION_CONFIDENCE
+            except (TypeError, ValueError):
+                return True
+        
+        response = await self._escalating(
+            "analyze_query_combined",
+            lambda model: self.generate_stream(prompt, format="json", stop_when=self._json_complete,
+                                               template="analyze_query_combined", model=model),
+            confident
+        )
+        analysis = self._parse_json_object(self._strip_think(response))
+        
+        if analysis is None:
+            analysis = {}
+            reasoning = "Could not parse structured analysis, using defaults"
+        else:
+            reasoning = str(analysis.get("reasoning_summary") or "Structured single-call analysis")
+        
+        query_type_valid = analysis.get("query_type") in ("direct_expert", "project_based")
+        if not query_type_valid:
+            analysis["query_type"] = self._guess_query_type(query)
+        
+        enhanced = [str(q).strip() for q in analysis.get("enhanced_queries") or [] if str(q).strip()][:count]
+        analysis["enhanced_queries"] = enhanced or self._default_query_variations(query)
+        
+        keywords = [re.sub(r'[^\w\s-]', '', str(k)).strip() for k in analysis.get("keywords") or []]
+        keywords = [k for k in keywords if len(k) > 1][:15]
+        analysis["keywords"] = keywords or self._basic_keywords(query)
+        
+        if not (query_type_valid and enhanced and keywords):
+            # Partly heuristic defaults; worth asking the model again next time
+            _fallback_used.set(True)
+        return analysis, reasoning
+    
+    @staticmethod
+    def _parse_json_object(text: str) -> Optional[Dict[str, Any]]:
+        """First JSON object in `text`, tolerating code fences and surrounding prose"""
+        if not text:
+            return None
+        try:
+            parsed = json.loads(text)
+        except json.JSONDecodeError:
+            match = re.search(r'\{.*\}', text, re.DOTALL)
+            if not match:
+                return None
+            try:
+                parsed = json.loads(match.group())
+            except json.JSONDecodeError:
+                return None
+        return parsed if isinstance(parsed, dict) else None
+    
+    @staticmethod
+    def _guess_query_type(query: str) -> str:
+        query_lower = query.lower()
+        if any(word in query_lower for word in ["project", "agenda", "initiative", "implementing", "building"]):
+            return "project_based"
+        return "direct_expert"
+    
+    @staticmethod
+    def _default_query_variations(query: str) -> List[str]:
+        return [
+            query,
+            f"experienced {query}",
+            f"senior {query} specialist"
+        ]
+    
+    @staticmethod
+    def _basic_keywords(query: str) -> List[str]:
+        words = query.lower().split()
+        stopwords = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'find', 'need', 'want'}
+        return [w for w in words if w not in stopwords and len(w) > 2][:10]
+    
     async def enhance_query(self, query: str, count: int = 3) -> List[str]:
         """Original enhance method for backward compatibility"""
-        enhanced, _ = await self.enhance_query_with_reasoning(query, count)
+        enhanced, _ = await self.enhance_query_with_reasoning(query, count, reasoning=False)
         return enhanced
     
-    async def enhance_query_with_reasoning(self, query: str, count: int = 3) -> Tuple[List[str], str]:
+    @_cached_call("enhance_query")
+    async def enhance_query_with_reasoning(self, query: str, count: int = 3,
+                                           reasoning: bool = True) -> Tuple[List[str], str]:
         """Generate enhanced queries with reasoning"""
         prompt = f"""
 Generate {count} enhanced search queries based on this original query.
@@ -174,26 +657,32 @@ Consider:
 Return only the enhanced queries, one per line, after your reasoning.
 """
         
-        response, reasoning = await self.generate_with_reasoning(prompt)
+        def parse(response: str) -> List[str]:
+            return [q.strip() for q in response.split('\n') if q.strip() and not q.startswith('-')][:count]
         
-        queries = [q.strip() for q in response.split('\n') if q.strip() and not q.startswith('-')][:count]
+        response, reasoning = await self._escalating(
+            "enhance_query",
+            lambda model: self.generate_with_reasoning(prompt, reasoning=reasoning, template="enhance_query",
+                                                       model=model),
+            lambda result: bool(parse(result[0]))
+        )
+        
+        queries = parse(response)
         
         if not queries:
-            queries = [
-                query,
-                f"experienced {query}",
-                f"senior {query} specialist"
-            ]
+            _fallback_used.set(True)
+            queries = self._default_query_variations(query)
             reasoning = "Using default query variations"
         
         return queries, reasoning
     
     async def extract_keywords(self, query: str) -> List[str]:
         """Original extract keywords method for backward compatibility"""
-        keywords, _ = await self.extract_keywords_with_reasoning(query)
+        keywords, _ = await self.extract_keywords_with_reasoning(query, reasoning=False)
         return keywords
     
-    async def extract_keywords_with_reasoning(self, query: str) -> Tuple[List[str], str]:
+    @_cached_call("extract_keywords")
+    async def extract_keywords_with_reasoning(self, query: str, reasoning: bool = True) -> Tuple[List[str], str]:
         """Extract keywords with reasoning"""
         prompt = f"""
 Extract important keywords from this query for search purposes.
@@ -208,17 +697,22 @@ Think about:
 Return ONLY comma-separated keywords after your reasoning.
 """
         
-        response, reasoning = await self.generate_with_reasoning(prompt)
+        def parse(response: str) -> List[str]:
+            response = re.sub(r'[^\w\s,-]', '', response or '')
+            return [k.strip() for k in response.split(',') if k.strip() and len(k.strip()) > 2][:15]
+        
+        response, reasoning = await self._escalating(
+            "extract_keywords",
+            lambda model: self.generate_with_reasoning(prompt, reasoning=reasoning, template="extract_keywords",
+                                                       model=model),
+            lambda result: bool(parse(result[0]))
+        )
         
-        keywords = []
-        if response:
-            response = re.sub(r'[^\w\s,-]', '', response)
-            keywords = [k.strip() for k in response.split(',') if k.strip() and len(k.strip()) > 2][:15]
+        keywords = parse(response)
         
         if not keywords:
-            words = query.lower().split()
-            stopwords = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'find', 'need', 'want'}
-            keywords = [w for w in words if w not in stopwords and len(w) > 2][:10]
+            _fallback_used.set(True)
+            keywords = self._basic_keywords(query)
             reasoning = "Used basic keyword extraction due to parsing issues"
 
         print(keywords)
@@ -226,17 +720,20 @@ Return ONLY comma-separated keywords after your reasoning.
     
     async def generate_expert_profile(self, project_description: str) -> str:
         """Generate ideal expert profile based on project description"""
+        description = prompt_budget.truncate_to_tokens(
+            project_description, PROMPT_TOKEN_BUDGETS["expert_profile"] - 100
+        )
         prompt = f"""
 Based on this project description, describe the ideal expert profile.
 Include required skills, experience, and expertise areas.
 
-Project: {project_description}
+Project: {description}
 
 Write a concise expert profile description (2-3 sentences) that can be used for searching.
 Focus on key skills and experience needed.
 """
         
-        response = await self.generate(prompt)
+        response = await self.generate(prompt, template="expert_profile")
         
         if response == "LLM service unavailable" or not response:
             return f"Expert with experience in: {project_description[:100]}..."
@@ -255,11 +752,12 @@ Focus on key skills and experience needed.
         
         results_to_rank = results[:10]
         
+        # Share the rerank token budget across experts instead of a fixed 80 characters
+        tokens = prompt_budget.item_budget("rerank", len(results_to_rank), prompt_budget.estimate_tokens(query) + 120)
         results_text = ""
         for i, r in enumerate(results_to_rank, 1):
-            headline = r.get('headline', 'No headline')[:80]
-            bio = r.get('bio', '')[:80]
-            results_text += f"{i}. {headline} | {bio}...\n"
+            headline, bio = prompt_budget.fit_expert(r.get('headline') or 'No headline', r.get('bio') or '', tokens)
+            results_text += f"{i}. {headline} | {bio}\n"
         
         prompt = f"""
 Rerank these experts based on relevance to: "{query}"
@@ -277,9 +775,11 @@ Output:
 """
         
         try:
-            response = await self.generate(prompt)
+            response = await self.generate_stream(
+                prompt, stop_when=self._number_list_complete(len(results_to_rank)), template="rerank"
+            )
             
-            cleaned = re.sub(r'[^\d,]', '', response.strip())
+            cleaned = re.sub(r'[^\d,]', '', self._strip_think(response).strip())
             
             if cleaned:
                 numbers = [int(n) for n in cleaned.split(',') if n]
@@ -323,18 +823,80 @@ Output:
         
         return reranked, "Reranked using keyword matching due to LLM parsing issues"
     
+    async def explain_relevance(self, query: str, experts: List[Dict]) -> Dict[Any, str]:
+        """One-sentence "why relevant" per expert id, for the experts actually
+        shown. Cached per (query, expert id); all uncached experts are
+        explained by a single JSON-mode call."""
+        query_hash = hashlib.sha1(normalize_query(query).encode()).hexdigest()
+        explanations = {}
+        missing = []
+        for expert in experts:
+            cached = _explanation_cache.get((query_hash, expert["id"]))
+            if cached is not None:
+                explanations[expert["id"]] = cached
+            else:
+                missing.append(expert)
+        metrics.increment("explanation_cache", len(explanations), result="hit")
+        metrics.increment("explanation_cache", len(missing), result="miss")
+        if not missing:
+            return explanations
+        
+        tokens = prompt_budget.item_budget("explain_relevance", len(missing), prompt_budget.estimate_tokens(query) + 120)
+        experts_text = "\n".join(
+            "[{}] {} - {}".format(e["id"], *prompt_budget.fit_expert(e.get("headline") or "No headline",
+                                                                    e.get("bio") or "", tokens))
+            for e in missing
+        )
+        prompt = f"""
+For each expert below, explain in one specific, concise sentence why they are relevant to the query.
+
+Query: {query}
+
+Experts (id in brackets):
+{experts_text}
+
+Return a JSON object mapping every expert id (as a string) to its sentence, e.g. {{"123": "..."}}.
+"""
+        
+        def parse(response: str) -> Dict[str, Any]:
+            return self._parse_json_object(self._strip_think(response)) or {}
+        
+        response = await self._escalating(
+            "explain_relevance",
+            lambda model: self.generate_stream(prompt, format="json", stop_when=self._json_complete,
+                                               template="explain_relevance", model=model),
+            # Escalate unless most experts got an explanation
+            lambda response: 2 * sum(str(e["id"]) in parse(response) for e in missing) >= len(missing)
+        )
+        parsed = parse(response)
+        
+        for expert in missing:
+            sentence = parsed.get(str(expert["id"]))
+            if isinstance(sentence, str) and sentence.strip():
+                explanations[expert["id"]] = sentence.strip()
+                _explanation_cache.put((query_hash, expert["id"]), sentence.strip())
+            else:
+                # Not cached, so a later page view can retry
+                explanations[expert["id"]] = "Matches query requirements"
+        return explanations
+    
     async def evaluate_expert_relevance(self, expert: Dict, query: str) -> str:
-        """Generate explanation for why an expert is relevant"""
+        """Generate explanation for why an expert is relevant (one call per
+        expert; use explain_relevance for a page of results)"""
+        headline, bio = prompt_budget.fit_expert(
+            expert.get('headline') or 'No headline', expert.get('bio') or '',
+            prompt_budget.item_budget("expert_relevance", 1, prompt_budget.estimate_tokens(query) + 60)
+        )
         prompt = f"""
 Explain in one sentence why this expert is relevant to the query.
 
 Query: {query}
-Expert: {expert.get('headline', 'No headline')} - {expert.get('bio', '')[:200]}
+Expert: {headline} - {bio}
 
 Be specific and concise.
 """
         
-        response = await self.generate(prompt)
+        response = await self.generate(prompt, template="expert_relevance")
         return response if response else "Matches query requirements"
     
     def _fallback_response(self, prompt: str) -> str:
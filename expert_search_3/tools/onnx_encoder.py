@@ -0,0 +1,207 @@
+import os
+import json
+import logging
+from contextlib import contextmanager
+from typing import List, Union
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: exports stay atomic, concurrent ones are just not serialised
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ONNX_INPUT_NAMES = ("input_ids", "attention_mask", "token_type_ids")
+
+# Embedded with PyTorch at export time and re-embedded with ONNX Runtime on
+# every load; a model whose probes drift below MIN_PROBE_COSINE is refused
+PROBE_TEXTS = [
+    "Senior cloud architect with AWS and Kubernetes experience",
+    "Regulatory affairs expert for medical devices in Germany",
+    "Supply chain optimisation for consumer goods manufacturers",
+    "Machine learning engineer building recommendation systems",
+]
+MIN_PROBE_COSINE = 0.98
+
+
+class OnnxAccuracyError(ValueError):
+    """The ONNX model's embeddings drifted too far from the PyTorch model's"""
+
+
+def min_cosine_similarity(reference: np.ndarray, embeddings: np.ndarray) -> float:
+    """Lowest row-wise cosine similarity between two embedding matrices"""
+    reference = np.asarray(reference, dtype=np.float32)
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(reference, axis=1) * np.linalg.norm(embeddings, axis=1)
+    return float(np.min(np.sum(reference * embeddings, axis=1) / np.clip(norms, 1e-12, None)))
+
+
+def _tmp_path(path: str) -> str:
+    return f"{path}.{os.getpid()}.tmp"
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive inter-process lock held for the duration of the block"""
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class OnnxSentenceEncoder:
+    """CPU inference for a mean-pooling SentenceTransformer through ONNX Runtime.
+
+    The transformer is exported once to ONNX (and, by default, dynamically
+    quantised to int8) under ``cache_dir``; later runs load the cached file.
+    ``encode`` mirrors ``SentenceTransformer.encode`` so either can be used.
+
+    Safe for several processes (e.g. gunicorn workers) sharing ``cache_dir``:
+    exports are serialised by a file lock and every file is written under a
+    temporary name and renamed into place, so a model file that exists is
+    complete and its tokenizer and config are already there.
+
+    Every load checks the model against PyTorch reference embeddings of
+    PROBE_TEXTS stored at export time and raises OnnxAccuracyError when the
+    lowest cosine similarity is below ``min_cosine``.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str = "data/onnx", quantize: bool = True,
+                 intra_op_threads: int = 0, min_cosine: float = MIN_PROBE_COSINE):
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError("ONNX backend requires onnxruntime and onnx: pip install onnxruntime onnx") from e
+
+        self.model_name = model_name
+        self.quantize = quantize
+        self.model_dir = os.path.join(cache_dir, model_name.replace("/", "__"))
+
+        model_path = self._ensure_exported()
+        with open(os.path.join(self.model_dir, "encoder_config.json")) as f:
+            config = json.load(f)
+        self.dim = config["dim"]
+        self.normalize = config["normalize"]
+        self.max_seq_length = config["max_seq_length"]
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self._check_accuracy(config.get("probe_embeddings"), min_cosine)
+        logger.info(f"Loaded ONNX encoder {model_path}")
+
+    def _check_accuracy(self, reference, min_cosine: float):
+        if reference is None:
+            logger.warning(f"{self.model_dir} predates probe embeddings; delete it to re-export "
+                           f"with the accuracy check")
+            return
+        similarity = min_cosine_similarity(reference, self.encode(PROBE_TEXTS))
+        if similarity < min_cosine:
+            raise OnnxAccuracyError(
+                f"ONNX encoder {self.model_dir} drifted from PyTorch: "
+                f"min probe cosine {similarity:.4f} < {min_cosine}"
+            )
+        logger.info(f"ONNX encoder probe cosine vs PyTorch: min {similarity:.4f}")
+
+    def _ensure_exported(self) -> str:
+        fp32_path = os.path.join(self.model_dir, "model.onnx")
+        int8_path = os.path.join(self.model_dir, "model.int8.onnx")
+        target = int8_path if self.quantize else fp32_path
+        if os.path.exists(target):
+            return target
+
+        os.makedirs(self.model_dir, exist_ok=True)
+        with _file_lock(os.path.join(self.model_dir, ".export.lock")):
+            # Another process may have finished the export while we waited
+            if os.path.exists(target):
+                return target
+            if not os.path.exists(fp32_path):
+                self._export(fp32_path)
+            if self.quantize:
+                from onnxruntime.quantization import quantize_dynamic, QuantType
+
+                logger.info(f"Quantising {fp32_path} to int8")
+                tmp_path = _tmp_path(int8_path)
+                quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+                os.replace(tmp_path, int8_path)
+        return target
+
+    def _export(self, path: str):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        logger.info(f"Exporting {self.model_name} to ONNX")
+        st = SentenceTransformer(self.model_name, device="cpu")
+        pooling = st[1]
+        if not getattr(pooling, "pooling_mode_mean_tokens", False):
+            raise ValueError(f"{self.model_name} does not use mean pooling; ONNX backend unsupported")
+
+        transformer = st[0].auto_model.eval()
+        dummy = st.tokenizer(["onnx export"], return_tensors="pt")
+        input_names = [n for n in ONNX_INPUT_NAMES if n in dummy]
+        dynamic_axes = {n: {0: "batch", 1: "sequence"} for n in input_names + ["last_hidden_state"]}
+        tmp_path = _tmp_path(path)
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer,
+                tuple(dummy[n] for n in input_names),
+                tmp_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14
+            )
+
+        st.tokenizer.save_pretrained(self.model_dir)
+        config_path = os.path.join(self.model_dir, "encoder_config.json")
+        with open(_tmp_path(config_path), "w") as f:
+            json.dump({
+                "dim": st.get_sentence_embedding_dimension(),
+                "normalize": any(type(m).__name__ == "Normalize" for m in st),
+                "max_seq_length": st.max_seq_length,
+                "probe_embeddings": st.encode(PROBE_TEXTS).tolist()
+            }, f)
+        os.replace(_tmp_path(config_path), config_path)
+        # The model file goes last: its presence means the export is complete
+        os.replace(tmp_path, path)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        batches = []
+        for i in range(0, len(texts), batch_size):
+            tokens = self.tokenizer(
+                texts[i:i + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feed = {n: tokens[n].astype(np.int64) for n in self.input_names}
+            hidden = self.session.run(["last_hidden_state"], feed)[0]
+
+            # Mean pooling over real (non-padding) tokens, as SentenceTransformer does
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled)
+
+        embeddings = np.concatenate(batches) if batches else np.empty((0, self.dim), dtype=np.float32)
+        if self.normalize or normalize_embeddings:
+            embeddings = embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings[0] if single else embeddings
@@ -0,0 +1,52 @@
+import re
+import threading
+from typing import Tuple
+from config.settings import PROMPT_TOKEN_BUDGETS
+
+# Characters per token of the LLM's tokenizer; starts at the usual ~4 for
+# English and is calibrated from the prompt_eval_count the backend reports
+_chars_per_token = 4.0
+_lock = threading.Lock()
+
+MIN_ITEM_TOKENS = 24
+
+
+def estimate_tokens(text: str) -> int:
+    return int(len(text) / _chars_per_token) + 1
+
+
+def calibrate(prompt_chars: int, prompt_tokens: int):
+    """Fold an observed (characters, tokens) pair into the running ratio"""
+    global _chars_per_token
+    if prompt_chars <= 0 or prompt_tokens <= 0:
+        return
+    with _lock:
+        _chars_per_token = 0.9 * _chars_per_token + 0.1 * (prompt_chars / prompt_tokens)
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Cut `text` to about `tokens`, preferring a sentence end, else a word boundary"""
+    limit = max(int(tokens * _chars_per_token), 0)
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    sentence_end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+    if sentence_end >= limit * 0.6:
+        return cut[:sentence_end + 1]
+    space = cut.rfind(" ")
+    if space >= limit * 0.6:
+        cut = cut[:space]
+    return re.sub(r'[\s,;:-]+$', '', cut) + "..."
+
+
+def item_budget(template: str, items: int, reserved_tokens: int) -> int:
+    """Tokens each of `items` entries may use in the `template` prompt once
+    `reserved_tokens` (instructions, query) are set aside"""
+    budget = PROMPT_TOKEN_BUDGETS.get(template, PROMPT_TOKEN_BUDGETS["default"])
+    return max(MIN_ITEM_TOKENS, (budget - reserved_tokens) // max(items, 1))
+
+
+def fit_expert(headline: str, bio: str, tokens: int) -> Tuple[str, str]:
+    """Headline (up to a third of the budget) and as much bio as fits after it"""
+    headline = truncate_to_tokens(headline, max(tokens // 3, 8))
+    return headline, truncate_to_tokens(bio, max(tokens - estimate_tokens(headline), 0))
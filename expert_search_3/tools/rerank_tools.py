@@ -0,0 +1,56 @@
+import asyncio
+from typing import List, Optional
+from config.settings import RERANKER_MODEL, RERANKER_MAX_LENGTH, RERANKER_BATCH_SIZE
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Loaded once per process and shared by every Reranker; a failed load is
+# remembered so later requests fall back immediately instead of retrying
+_shared_scorer: Optional["CrossEncoderScorer"] = None
+_load_failed = False
+_load_lock = asyncio.Lock()
+
+
+class CrossEncoderScorer:
+    """Scores (query, document) pairs with a local cross-encoder on CPU.
+
+    Unlike the bi-encoder used for retrieval, the query and the expert text
+    are read together, so scores are directly comparable relevance estimates.
+    """
+
+    def __init__(self, model_name: str = RERANKER_MODEL, max_length: int = RERANKER_MAX_LENGTH,
+                 batch_size: int = RERANKER_BATCH_SIZE):
+        from sentence_transformers import CrossEncoder
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = CrossEncoder(model_name, max_length=max_length, device="cpu")
+        logger.info(f"Loaded cross-encoder: {model_name}")
+
+    def score(self, query: str, documents: List[str]) -> List[float]:
+        """Relevance score per document, higher is better"""
+        if not documents:
+            return []
+        scores = self.model.predict(
+            [(query, doc) for doc in documents],
+            batch_size=self.batch_size,
+            show_progress_bar=False
+        )
+        return [float(s) for s in scores]
+
+
+async def get_cross_encoder() -> Optional[CrossEncoderScorer]:
+    """The shared scorer, or None if the model cannot be loaded. The model is
+    loaded in a worker thread so the first rerank does not block the event loop."""
+    global _shared_scorer, _load_failed
+    if _shared_scorer is not None or _load_failed:
+        return _shared_scorer
+    async with _load_lock:
+        if _shared_scorer is None and not _load_failed:
+            try:
+                _shared_scorer = await asyncio.to_thread(CrossEncoderScorer)
+            except Exception as e:
+                logger.error(f"Error loading cross-encoder {RERANKER_MODEL}, using LLM reranking: {e}")
+                _load_failed = True
+    return _shared_scorer
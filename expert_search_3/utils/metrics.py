@@ -0,0 +1,81 @@
+import bisect
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Sequence
+
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000, 30000, 60000, 120000)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+_counters: Dict[str, int] = defaultdict(int)
+_histograms: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+
+def _key(name: str, labels: Dict[str, str]) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+    return f"{name}{{{rendered}}}"
+
+
+def increment(name: str, value: int = 1, **labels):
+    """Add to a process-wide counter, e.g. increment("es_fallback", kind="knn")"""
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def observe(name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS_MS, **labels):
+    """Record a value in a histogram, e.g. observe("llm_latency_ms", 812, template="rerank")"""
+    with _lock:
+        histogram = _histograms.get(_key(name, labels))
+        if histogram is None:
+            histogram = _histograms[_key(name, labels)] = {
+                "buckets": tuple(buckets), "counts": [0] * (len(buckets) + 1), "count": 0, "sum": 0.0
+            }
+        histogram["counts"][bisect.bisect_left(histogram["buckets"], value)] += 1
+        histogram["count"] += 1
+        histogram["sum"] += value
+
+
+def _bucket_quantile(histogram: Dict[str, Any], q: float) -> float:
+    """Upper bound of the bucket holding the q-quantile (inf past the last bucket)"""
+    rank = q * histogram["count"]
+    seen = 0
+    for bound, count in zip(histogram["buckets"], histogram["counts"]):
+        seen += count
+        if seen >= rank:
+            return bound
+    return float("inf")
+
+
+def get_histograms() -> Dict[str, Dict[str, Any]]:
+    """Snapshot of all histograms: count, sum, mean, bucket-resolution
+    p50/p95 and cumulative counts per upper bound (le)"""
+    with _lock:
+        snapshot = {}
+        for key, h in _histograms.items():
+            cumulative, running = {}, 0
+            for bound, count in zip(list(h["buckets"]) + ["+Inf"], h["counts"]):
+                running += count
+                cumulative[str(bound)] = running
+            snapshot[key] = {
+                "count": h["count"],
+                "sum": round(h["sum"], 3),
+                "mean": round(h["sum"] / h["count"], 3) if h["count"] else 0.0,
+                "p50": _bucket_quantile(h, 0.5),
+                "p95": _bucket_quantile(h, 0.95),
+                "le": cumulative
+            }
+        return snapshot
+
+
+def get_counters() -> Dict[str, int]:
+    """Snapshot of all counters keyed as name{label=value,...}"""
+    with _lock:
+        return dict(_counters)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
@@ -4,6 +4,7 @@ from models.schemas import SearchQuery, Expert, QueryType, ReasoningTrace, Agent
 from agents.query_analyzer import QueryAnalyzer
 from agents.search_agent import SearchAgent
 from agents.reranker import Reranker
+from tools.llm_tools import LLMClient
 from agents.learning_agent import LearningAgent
 from datetime import datetime
 import asyncio
@@ -27,14 +28,23 @@ class AutonomousWorkflowState(TypedDict):
 
 class AutonomousExpertSearchWorkflow:
     def __init__(self):
-        self.query_analyzer = QueryAnalyzer()
-        self.search_agent = SearchAgent()
-        self.reranker = Reranker()
+        # One LLM client (and connection pool) for every agent in the workflow
+        self.llm_client = LLMClient()
+        self.query_analyzer = QueryAnalyzer(self.llm_client)
+        self.search_agent = SearchAgent(self.llm_client)
+        # Lets the LLM cache reuse answers for near-duplicate queries
+        self.llm_client.embedder = self.search_agent.embedding_gen.generate_embedding
+        self.reranker = Reranker(self.llm_client)
         self.learning_agent = LearningAgent()
         self.workflow = self._create_workflow()
         self.max_iterations = 10
         self.target_quality = 0.8
     
+    async def aclose(self):
+        """Release the pooled LLM and Elasticsearch connections"""
+        await self.llm_client.aclose()
+        await self.search_agent.es_client.close()
+    
     def _create_workflow(self) -> StateGraph:
         workflow = StateGraph(AutonomousWorkflowState)
         
@@ -172,7 +182,8 @@ class AutonomousExpertSearchWorkflow:
                 original_query=f"expert in {skill}",
                 query_type=QueryType.DIRECT_EXPERT,
                 enhanced_queries=[],
-                keywords=[skill]
+                keywords=[skill],
+                filters=search_query.filters
             )
             
             experts = await self.search_agent.search_direct_experts(skill_query)
@@ -199,7 +210,8 @@ class AutonomousExpertSearchWorkflow:
                         original_query=f"expert in {function}",
                         query_type=QueryType.DIRECT_EXPERT,
                         enhanced_queries=[],
-                        keywords=[function]
+                        keywords=[function],
+                        filters=search_query.filters
                     )
                     similar = await self.search_agent.search_direct_experts(similar_query)
                     expanded_experts.extend(similar[:2])
@@ -4,6 +4,7 @@ from models.schemas import SearchQuery, Expert, QueryType, ReasoningTrace
 from agents.query_analyzer import QueryAnalyzer
 from agents.search_agent import SearchAgent
 from agents.reranker import Reranker
+from tools.llm_tools import LLMClient
 import asyncio
 from datetime import datetime
 import logging
@@ -21,11 +22,20 @@ class WorkflowState(TypedDict):
 class ExpertSearchWorkflow:
     """Original workflow for basic expert search with limited retries"""
     def __init__(self):
-        self.query_analyzer = QueryAnalyzer()
-        self.search_agent = SearchAgent()
-        self.reranker = Reranker()
+        # One LLM client (and connection pool) for every agent in the workflow
+        self.llm_client = LLMClient()
+        self.query_analyzer = QueryAnalyzer(self.llm_client)
+        self.search_agent = SearchAgent(self.llm_client)
+        # Lets the LLM cache reuse answers for near-duplicate queries
+        self.llm_client.embedder = self.search_agent.embedding_gen.generate_embedding
+        self.reranker = Reranker(self.llm_client)
         self.workflow = self._create_workflow()
     
+    async def aclose(self):
+        """Release the pooled LLM and Elasticsearch connections"""
+        await self.llm_client.aclose()
+        await self.search_agent.es_client.close()
+    
     def _create_workflow(self) -> StateGraph:
         workflow = StateGraph(WorkflowState)
         
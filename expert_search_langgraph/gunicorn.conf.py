@@ -0,0 +1,18 @@
+# gunicorn -c gunicorn.conf.py server:app
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+# server.py reads the same variable to refuse per-worker ingests
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Build BM25/vector indexes once in the master; workers inherit them via fork
+preload_app = True
+timeout = 120
+
+
+def post_fork(server, worker):
+    from server import service
+
+    service.reconnect()
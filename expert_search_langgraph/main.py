@@ -55,37 +55,41 @@ def extract_agenda_docs(df: pd.DataFrame):
     return docs
 
 
-def main():
-    # Load data
-    normal_df = pd.read_csv("experts_202505291522.csv", encoding="utf8")
-    proj_df = pd.read_csv("project_expert_data.csv", encoding="latin1")
-
-    # Initialize tools
-    print("Initializing search tools...")
-    norm_vec_tool = StructuredVectorSearchTool(collection_name="norm_experts")
+def build_search_tools(normal_df: pd.DataFrame, proj_df: pd.DataFrame,
+                       vector_backend: str = "qdrant", query_backend: str = "torch"):
+    """Build and populate the four retrieval tools"""
+    norm_vec_tool = StructuredVectorSearchTool(
+        collection_name="norm_experts", backend=vector_backend, query_backend=query_backend
+    )
     norm_vec_tool.add_documents(normal_df)
     
     norm_kw_tool = StructuredKeywordSearchTool()
     norm_kw_tool.add_documents(normal_df)
 
     proj_docs = extract_agenda_docs(proj_df)
-    proj_vec_tool = AgendaVectorSearchTool(collection_name="agenda_responses")
+    proj_vec_tool = AgendaVectorSearchTool(
+        collection_name="agenda_responses", backend=vector_backend, query_backend=query_backend
+    )
     proj_vec_tool.add_documents(proj_docs)
     
     proj_kw_tool = AgendaKeywordSearchTool()
     proj_kw_tool.add_documents(proj_docs)
 
-    # Setup reranker & refiner
+    return {
+        "normal_vec_tool": norm_vec_tool,
+        "normal_kw_tool": norm_kw_tool,
+        "proj_vec_tool": proj_vec_tool,
+        "proj_kw_tool": proj_kw_tool
+    }
+
+
+def build_search_graph(tools: dict):
+    """Create the LangGraph on top of already populated tools"""
     reranker = AgendaResultsReranker(alpha=0.6)
     refiner = GeminiQueryRefiner(llm, n_variants=3)
 
-    # Create the LangGraph
-    print("Building LangGraph...")
-    graph = create_expert_search_graph(
-        normal_vec_tool=norm_vec_tool,
-        normal_kw_tool=norm_kw_tool,
-        proj_vec_tool=proj_vec_tool,
-        proj_kw_tool=proj_kw_tool,
+    return create_expert_search_graph(
+        **tools,
         reranker=reranker,
         refiner=refiner,
         initial_k=10,
@@ -93,6 +97,41 @@ def main():
         quality_threshold=0.5
     )
 
+
+def initial_search_state(query: str) -> ExpertSearchState:
+    """Fresh graph state for a single query"""
+    return ExpertSearchState(
+        query=query,
+        refined_queries=[],
+        normal_vector_results=[],
+        normal_keyword_results=[],
+        project_vector_results=[],
+        project_keyword_results=[],
+        merged_results=[],
+        final_results=[],
+        quality_score=0.0,
+        should_refine=False,
+        iteration=0
+    )
+
+
+def main():
+    # Load data
+    normal_df = pd.read_csv("experts_202505291522.csv", encoding="utf8")
+    proj_df = pd.read_csv("project_expert_data.csv", encoding="latin1")
+
+    # Initialize tools
+    print("Initializing search tools...")
+    tools = build_search_tools(
+        normal_df, proj_df,
+        os.getenv("VECTOR_BACKEND", "qdrant"),
+        os.getenv("QUERY_EMBEDDING_BACKEND", "torch")
+    )
+
+    # Create the LangGraph
+    print("Building LangGraph...")
+    graph = build_search_graph(tools)
+
     # Interactive loop
     print("\nExpert Search Ready!")
     while True:
@@ -101,19 +140,7 @@ def main():
             break
 
         # Initialize state
-        initial_state = ExpertSearchState(
-            query=query,
-            refined_queries=[],
-            normal_vector_results=[],
-            normal_keyword_results=[],
-            project_vector_results=[],
-            project_keyword_results=[],
-            merged_results=[],
-            final_results=[],
-            quality_score=0.0,
-            should_refine=False,
-            iteration=0
-        )
+        initial_state = initial_search_state(query)
 
         # Run the graph
         try:
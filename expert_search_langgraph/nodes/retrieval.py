@@ -20,10 +20,14 @@ def retrieve_experts(
     # Initialize result lists
     nv_all, nk_all, pv_all, pk_all = [], [], [], []
     
+    # Vector tools embed and look up every query variant in one batch
+    for hits in normal_vec_tool.search_batch(queries, top_k=initial_k):
+        nv_all.extend(hits)
+    for hits in proj_vec_tool.search_batch(queries, top_k=initial_k):
+        pv_all.extend(hits)
+
     for q in queries:
-        nv_all.extend(normal_vec_tool.search(q, top_k=initial_k))
         nk_all.extend(normal_kw_tool.search(q, top_k=initial_k))
-        pv_all.extend(proj_vec_tool.search(q, top_k=initial_k))
         pk_all.extend(proj_kw_tool.search(q, top_k=initial_k))
     
     # Normalize IDs
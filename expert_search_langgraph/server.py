@@ -0,0 +1,143 @@
+import os
+import time
+import logging
+import threading
+from typing import List, Dict, Any, Literal
+
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+
+from tools.model_registry import model_stats
+from main import (
+    extract_agenda_docs,
+    build_search_tools,
+    build_search_graph,
+    initial_search_state
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NORMAL_DATA_PATH = os.getenv("NORMAL_DATA_PATH", "experts_202505291522.csv")
+PROJECT_DATA_PATH = os.getenv("PROJECT_DATA_PATH", "project_expert_data.csv")
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant")
+QUERY_EMBEDDING_BACKEND = os.getenv("QUERY_EMBEDDING_BACKEND", "torch")
+# Worker processes serving this app (uvicorn --workers and gunicorn.conf.py
+# both take it from WEB_CONCURRENCY). In-process indexes cannot be updated in
+# every worker from one request, so /ingest is only served by a single worker.
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+
+class SearchRequest(BaseModel):
+    query: str
+
+
+class IngestRequest(BaseModel):
+    source: Literal["normal", "project"]
+    records: List[Dict[str, Any]] = Field(..., min_length=1)
+
+
+class SearchService:
+    """Holds the populated tools and the compiled graph for the process lifetime"""
+
+    def __init__(self, normal_df: pd.DataFrame, proj_df: pd.DataFrame,
+                 vector_backend: str = "qdrant", query_backend: str = "torch"):
+        start = time.perf_counter()
+        self.tools = build_search_tools(normal_df, proj_df, vector_backend, query_backend)
+        self.graph = build_search_graph(self.tools)
+        # Searches only read the indexes; ingests are serialized so two
+        # rebuilds of the same BM25 index never race each other
+        self._ingest_lock = threading.Lock()
+        logger.info(f"Search indexes built in {time.perf_counter() - start:.2f}s")
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        result = self.graph.invoke(initial_search_state(query))
+        return result["final_results"]
+
+    def ingest(self, source: str, records: List[Dict[str, Any]]) -> int:
+        if not records:
+            return 0
+        with self._ingest_lock:
+            if source == "normal":
+                self.tools["normal_vec_tool"].add_documents(records)
+                self.tools["normal_kw_tool"].add_documents(records)
+                return len(records)
+
+            docs = extract_agenda_docs(pd.DataFrame(records))
+            if docs:
+                self.tools["proj_vec_tool"].add_documents(docs)
+                self.tools["proj_kw_tool"].add_documents(docs)
+            return len(docs)
+
+    def reconnect(self):
+        """Drop connections inherited from the parent process after a fork"""
+        for name in ("normal_vec_tool", "proj_vec_tool"):
+            self.tools[name].reconnect()
+
+
+def load_service() -> SearchService:
+    normal_df = pd.read_csv(NORMAL_DATA_PATH, encoding="utf8")
+    proj_df = pd.read_csv(PROJECT_DATA_PATH, encoding="latin1")
+    return SearchService(normal_df, proj_df, VECTOR_BACKEND, QUERY_EMBEDDING_BACKEND)
+
+
+# Built at import time so that a preloading master (gunicorn --preload)
+# builds the indexes once and every forked worker shares the pages
+# copy-on-write instead of re-embedding the corpora.
+service = load_service()
+
+app = FastAPI(title="Expert Search")
+
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    response.headers["X-Response-Time-Ms"] = f"{elapsed_ms:.1f}"
+    logger.info(f"{request.method} {request.url.path} {response.status_code} {elapsed_ms:.1f}ms")
+    return response
+
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy", "pid": os.getpid(), **model_stats()}
+
+
+@app.post("/search")
+async def search(req: SearchRequest):
+    start = time.perf_counter()
+    # The graph and tools are synchronous; run them off the event loop so
+    # concurrent requests are served from the thread pool
+    experts = await run_in_threadpool(service.search, req.query)
+    return {
+        "query": req.query,
+        "experts": experts,
+        "latency_ms": round((time.perf_counter() - start) * 1000, 1)
+    }
+
+
+@app.post("/ingest")
+async def ingest(req: IngestRequest):
+    if WORKERS > 1:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Ingest would only update 1 of {WORKERS} workers; run with WEB_CONCURRENCY=1 "
+                   f"or rebuild the indexes and restart"
+        )
+    start = time.perf_counter()
+    indexed = await run_in_threadpool(service.ingest, req.source, req.records)
+    return {
+        "source": req.source,
+        "indexed": indexed,
+        "pid": os.getpid(),
+        "latency_ms": round((time.perf_counter() - start) * 1000, 1)
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "8000")))
@@ -8,11 +8,21 @@ class BaseKeywordSearchTool:
         self.k1 = k1
         self.b = b
         self.docs: List[dict] = []
+        self.tokenized: List[List[str]] = []
         self.bm25: Optional[BM25Okapi] = None
 
     def _tokenize(self, text: str) -> List[str]:
         return re.findall(r"\w+", text.lower())
 
+    def _extend_index(self, docs: List[dict], corpus: List[str]):
+        # Append-only, so indices handed out by an older BM25 stay valid
+        # for concurrent readers while the new index is being built
+        tokenized = self.tokenized + [self._tokenize(t) for t in corpus]
+        bm25 = BM25Okapi(tokenized, k1=self.k1, b=self.b)
+        self.tokenized = tokenized
+        self.docs = self.docs + list(docs)
+        self.bm25 = bm25
+
     def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         if not self.bm25:
             raise RuntimeError("Call add_documents() first")
@@ -29,15 +39,13 @@ class StructuredKeywordSearchTool(BaseKeywordSearchTool):
     def _aggregate_text(self, doc: dict) -> str:
         # Reuse the same logic from vector search
         from .vector_search import StructuredVectorSearchTool
-        return StructuredVectorSearchTool(collection_name="temp")._aggregate_text(doc)
+        return StructuredVectorSearchTool._aggregate_text(doc)
 
     def add_documents(self, docs: pd.DataFrame | List[dict]):
         if isinstance(docs, pd.DataFrame):
             docs = docs.to_dict(orient="records")
-        self.docs = docs
         corpus = [self._aggregate_text(d) for d in docs]
-        tokenized = [self._tokenize(t) for t in corpus]
-        self.bm25 = BM25Okapi(tokenized, k1=self.k1, b=self.b)
+        self._extend_index(docs, corpus)
 
     def _format_results(self, idxs: List[int], scores: List[float]) -> List[Dict[str, Any]]:
         results: List[Dict[str, Any]] = []
@@ -56,10 +64,8 @@ class StructuredKeywordSearchTool(BaseKeywordSearchTool):
 
 class AgendaKeywordSearchTool(BaseKeywordSearchTool):
     def add_documents(self, docs: List[dict]):
-        self.docs = docs
         corpus = [d["text"] for d in docs]
-        tokenized = [self._tokenize(c) for c in corpus]
-        self.bm25 = BM25Okapi(tokenized, k1=self.k1, b=self.b)
+        self._extend_index(docs, corpus)
 
     def _format_results(self, idxs: List[int], scores: List[float]) -> List[Dict[str, Any]]:
         return [
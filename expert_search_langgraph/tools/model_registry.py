@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import logging
+import threading
+from typing import Dict, Any
+
+from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+_models: Dict[str, Any] = {}
+_stats: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+WARMUP_TEXTS = ["expert search warm-up query"]
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", "onnx_models")
+
+
+def _rss_mb() -> float:
+    """Current resident set size of this process in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows without psutil
+        return 0.0
+    # Last resort is the peak, not current, RSS: bytes on macOS, KB elsewhere
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def get_model(name: str, backend: str = "torch"):
+    """Process-wide encoder, loaded and warmed up on first use.
+
+    ``backend`` is "torch" (SentenceTransformer) or "onnx" (int8 ONNX Runtime);
+    both expose the same ``encode`` API. An ONNX model that cannot be loaded
+    or fails its accuracy check falls back to torch.
+    """
+    key = f"{name}:{backend}"
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        if key in _models:
+            return _models[key]
+
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+        model = None
+        if backend == "onnx":
+            try:
+                from .onnx_encoder import OnnxSentenceEncoder
+
+                model = OnnxSentenceEncoder(name, cache_dir=ONNX_CACHE_DIR)
+            except Exception as e:
+                # Missing onnxruntime, failed export or accuracy check: stay on PyTorch
+                logger.error(f"ONNX backend unavailable for {name}, using torch: {e}")
+        if model is None:
+            model = SentenceTransformer(name)
+        load_s = time.perf_counter() - start
+
+        # First encode pays for lazy allocations and kernel selection;
+        # do it here rather than on the first user query
+        start = time.perf_counter()
+        model.encode(WARMUP_TEXTS)
+        warmup_s = time.perf_counter() - start
+
+        _stats[key] = {
+            "load_seconds": round(load_s, 3),
+            "warmup_seconds": round(warmup_s, 3),
+            "rss_delta_mb": round(_rss_mb() - rss_before, 1),
+        }
+        logger.info(
+            f"Loaded embedding model {key} in {load_s:.2f}s "
+            f"(warm-up {warmup_s:.2f}s, +{_stats[key]['rss_delta_mb']}MB RSS)"
+        )
+        _models[key] = model
+        return model
+
+
+def model_stats() -> Dict[str, Any]:
+    """Load/warm-up timings per model and current process RSS"""
+    return {"models": dict(_stats), "process_rss_mb": round(_rss_mb(), 1)}
@@ -0,0 +1,367 @@
+import os
+import json
+import threading
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+
+@dataclass
+class VectorHit:
+    """Backend-agnostic search hit; mirrors the fields of Qdrant's ScoredPoint"""
+    id: int
+    score: float
+    payload: Dict[str, Any]
+
+
+def _group_hits(hits: List[VectorHit], group_by: str, group_size: int) -> List[List[VectorHit]]:
+    """Bucket score-ordered hits by payload key, keeping first-seen group order"""
+    groups: Dict[Any, List[VectorHit]] = {}
+    for h in hits:
+        group = groups.setdefault(h.payload.get(group_by), [])
+        if len(group) < group_size:
+            group.append(h)
+    return list(groups.values())
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class BaseVectorBackend:
+    """Storage and nearest-neighbour lookup behind BaseVectorSearchTool.
+
+    All backends use cosine similarity, so scores are comparable across them.
+    """
+
+    def setup(self, dim: int):
+        raise NotImplementedError
+
+    def upsert(self, ids: List[int], vectors: np.ndarray, payloads: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    def search(self, query_vector: np.ndarray, top_k: int = 5) -> List[VectorHit]:
+        return self.search_batch(np.asarray([query_vector]), top_k)[0]
+
+    def search_batch(self, query_vectors: np.ndarray, top_k: int = 5) -> List[List[VectorHit]]:
+        return [self.search(q, top_k) for q in query_vectors]
+
+    def search_groups(self, query_vector: np.ndarray, group_by: str, top_k: int = 5,
+                      group_size: int = 1) -> List[List[VectorHit]]:
+        """Top ``top_k`` distinct values of payload[group_by], each with up to
+        ``group_size`` best hits. Generic over-fetch-and-group; backends with
+        native grouping override it."""
+        fetch = top_k * group_size * 4
+        while True:
+            hits = self.search(query_vector, fetch)
+            groups = _group_hits(hits, group_by, group_size)
+            if len(groups) >= top_k or len(hits) < fetch:
+                return groups[:top_k]
+            fetch *= 4
+
+    def reconnect(self):
+        """Re-open external connections; no-op for in-process backends"""
+
+    def save(self, path: str):
+        raise NotImplementedError(f"{type(self).__name__} does not support save()")
+
+    def load(self, path: str):
+        raise NotImplementedError(f"{type(self).__name__} does not support load()")
+
+
+class QdrantBackend(BaseVectorBackend):
+    def __init__(self, collection_name: str, qdrant_url: str = "http://localhost:6333"):
+        from qdrant_client import QdrantClient
+
+        self.collection_name = collection_name
+        self.qdrant_url = qdrant_url
+        self.client = QdrantClient(url=qdrant_url)
+
+    def reconnect(self):
+        from qdrant_client import QdrantClient
+
+        self.client = QdrantClient(url=self.qdrant_url)
+
+    def setup(self, dim: int):
+        from qdrant_client.http.models import VectorParams, Distance
+
+        if self.client.collection_exists(self.collection_name):
+            self.client.delete_collection(self.collection_name)
+        self.client.create_collection(
+            collection_name=self.collection_name,
+            vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
+        )
+
+    def upsert(self, ids: List[int], vectors: np.ndarray, payloads: List[Dict[str, Any]]):
+        from qdrant_client.http.models import PointStruct
+
+        points = [
+            PointStruct(id=i, vector=v.tolist(), payload=p)
+            for i, v, p in zip(ids, vectors, payloads)
+        ]
+        self.client.upsert(
+            collection_name=self.collection_name,
+            points=points,
+            wait=True
+        )
+
+    def search(self, query_vector: np.ndarray, top_k: int = 5) -> List[VectorHit]:
+        hits = self.client.search(
+            collection_name=self.collection_name,
+            query_vector=np.asarray(query_vector).tolist(),
+            limit=top_k
+        )
+        return [VectorHit(id=h.id, score=h.score, payload=h.payload) for h in hits]
+
+    def search_groups(self, query_vector: np.ndarray, group_by: str, top_k: int = 5,
+                      group_size: int = 1) -> List[List[VectorHit]]:
+        result = self.client.search_groups(
+            collection_name=self.collection_name,
+            query_vector=np.asarray(query_vector).tolist(),
+            group_by=group_by,
+            limit=top_k,
+            group_size=group_size,
+            with_payload=True
+        )
+        return [
+            [VectorHit(id=h.id, score=h.score, payload=h.payload) for h in g.hits]
+            for g in result.groups
+        ]
+
+
+class _InProcessBackend(BaseVectorBackend):
+    """Shared id/payload bookkeeping and persistence for in-process backends"""
+
+    def __init__(self):
+        self.dim: Optional[int] = None
+        self.ids: List[int] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self._row_of: Dict[int, int] = {}
+        # Writers are serialized. ExactBackend readers need no lock: arrays
+        # are swapped in rather than mutated in place. HNSWBackend updates its
+        # graph in place, so its searches take the lock as well.
+        self._write_lock = threading.Lock()
+
+    def setup(self, dim: int):
+        self.dim = dim
+
+    def _hits(self, rows: np.ndarray, scores: np.ndarray) -> List[VectorHit]:
+        return [
+            VectorHit(id=self.ids[r], score=float(s), payload=self.payloads[r])
+            for r, s in zip(rows, scores)
+        ]
+
+    def _save_meta(self, path: str, **extra):
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"dim": self.dim, "ids": self.ids, **extra}, f)
+        with open(os.path.join(path, "payloads.json"), "w") as f:
+            json.dump(self.payloads, f, default=str)
+
+    def _load_meta(self, path: str) -> Dict[str, Any]:
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        with open(os.path.join(path, "payloads.json")) as f:
+            self.payloads = json.load(f)
+        self.dim = meta["dim"]
+        self.ids = meta["ids"]
+        self._row_of = {eid: row for row, eid in enumerate(self.ids)}
+        return meta
+
+
+class ExactBackend(_InProcessBackend):
+    """Brute-force cosine search over a normalised numpy matrix.
+
+    One matmul per batch of queries; exact and fastest up to ~100k rows.
+    With ``quantize=True`` rows are stored as int8 (4x smaller) at a small
+    cost in score precision; rounding can push a score slightly past 1, so
+    int8 scores are clipped to [-1, 1].
+    """
+
+    def __init__(self, quantize: bool = False):
+        super().__init__()
+        self.quantize = quantize
+        self.matrix: Optional[np.ndarray] = None
+
+    def _encode_rows(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = _normalize(vectors)
+        if self.quantize:
+            return np.clip(np.round(vectors * 127), -127, 127).astype(np.int8)
+        return vectors
+
+    def upsert(self, ids: List[int], vectors: np.ndarray, payloads: List[Dict[str, Any]]):
+        if len(ids) == 0:
+            return
+        rows = self._encode_rows(vectors)
+        with self._write_lock:
+            matrix = (
+                np.empty((0, rows.shape[1]), dtype=rows.dtype)
+                if self.matrix is None else np.array(self.matrix)
+            )
+            ids_, payloads_, row_of = list(self.ids), list(self.payloads), dict(self._row_of)
+            new_rows = []
+            for eid, row, payload in zip(ids, rows, payloads):
+                if eid in row_of:
+                    r = row_of[eid]
+                    if r < len(matrix):
+                        matrix[r] = row
+                    else:
+                        new_rows[r - len(matrix)] = row
+                    payloads_[r] = payload
+                    continue
+                row_of[eid] = len(ids_)
+                ids_.append(eid)
+                payloads_.append(payload)
+                new_rows.append(row)
+            if new_rows:
+                matrix = np.vstack([matrix, np.stack(new_rows)])
+            self.ids, self.payloads, self._row_of = ids_, payloads_, row_of
+            self.matrix = matrix
+
+    def search_batch(self, query_vectors: np.ndarray, top_k: int = 5) -> List[List[VectorHit]]:
+        matrix, n = self.matrix, len(self.ids)
+        if matrix is None or n == 0:
+            return [[] for _ in query_vectors]
+
+        queries = _normalize(np.atleast_2d(query_vectors))
+        scores = queries @ matrix.T
+        if self.quantize:
+            scores = np.clip(scores / 127.0, -1.0, 1.0)
+
+        k = min(top_k, n)
+        results = []
+        for row_scores in scores:
+            top = np.argpartition(-row_scores, k - 1)[:k]
+            top = top[np.argsort(-row_scores[top])]
+            results.append(self._hits(top, row_scores[top]))
+        return results
+
+    def search_groups(self, query_vector: np.ndarray, group_by: str, top_k: int = 5,
+                      group_size: int = 1) -> List[List[VectorHit]]:
+        matrix, n = self.matrix, len(self.ids)
+        if matrix is None or n == 0:
+            return []
+
+        # Every row is scored anyway, so walk the full ranking once instead
+        # of re-querying with a growing over-fetch
+        scores = matrix @ _normalize(query_vector)
+        if self.quantize:
+            scores = np.clip(scores / 127.0, -1.0, 1.0)
+        groups: Dict[Any, List[VectorHit]] = {}
+        for r in np.argsort(-scores):
+            key = self.payloads[r].get(group_by)
+            if key not in groups:
+                if len(groups) >= top_k:
+                    continue
+                groups[key] = []
+            if len(groups[key]) < group_size:
+                groups[key].append(VectorHit(id=self.ids[r], score=float(scores[r]), payload=self.payloads[r]))
+            if len(groups) >= top_k and all(len(g) >= group_size for g in groups.values()):
+                break
+        return list(groups.values())
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "vectors.npy"), self.matrix)
+        self._save_meta(path, quantize=self.quantize)
+
+    def load(self, path: str, mmap: bool = True):
+        """Load a saved index; with ``mmap`` the matrix is paged in lazily
+        and shared between processes mapping the same file"""
+        meta = self._load_meta(path)
+        self.quantize = meta.get("quantize", False)
+        self.matrix = np.load(
+            os.path.join(path, "vectors.npy"),
+            mmap_mode="r" if mmap else None
+        )
+
+
+class HNSWBackend(_InProcessBackend):
+    """Approximate search with an hnswlib HNSW graph for large corpora"""
+
+    def __init__(self, m: int = 16, ef_construction: int = 200, ef_search: int = 64,
+                 initial_capacity: int = 10000):
+        super().__init__()
+        try:
+            import hnswlib
+        except ImportError as e:
+            raise ImportError("HNSWBackend requires hnswlib: pip install hnswlib") from e
+        self._hnswlib = hnswlib
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.initial_capacity = initial_capacity
+        self.index = None
+
+    def setup(self, dim: int):
+        super().setup(dim)
+        self.index = self._hnswlib.Index(space="cosine", dim=dim)
+        self.index.init_index(
+            max_elements=self.initial_capacity,
+            ef_construction=self.ef_construction,
+            M=self.m
+        )
+        self.index.set_ef(self.ef_search)
+
+    def upsert(self, ids: List[int], vectors: np.ndarray, payloads: List[Dict[str, Any]]):
+        if len(ids) == 0:
+            return
+        vectors = _normalize(vectors)
+        with self._write_lock:
+            needed = len(set(self.ids) | set(ids))
+            if needed > self.index.get_max_elements():
+                self.index.resize_index(max(needed, 2 * self.index.get_max_elements()))
+
+            # hnswlib labels are the row numbers into ids/payloads
+            labels = []
+            for eid, payload in zip(ids, payloads):
+                if eid in self._row_of:
+                    self.payloads[self._row_of[eid]] = payload
+                else:
+                    self._row_of[eid] = len(self.ids)
+                    self.ids.append(eid)
+                    self.payloads.append(payload)
+                labels.append(self._row_of[eid])
+            self.index.add_items(vectors, np.asarray(labels))
+
+    def search_batch(self, query_vectors: np.ndarray, top_k: int = 5) -> List[List[VectorHit]]:
+        queries = _normalize(np.atleast_2d(query_vectors))
+        # The graph, ids and payloads are updated in place by upsert
+        with self._write_lock:
+            n = len(self.ids)
+            if self.index is None or n == 0:
+                return [[] for _ in query_vectors]
+
+            k = min(top_k, n)
+            self.index.set_ef(max(self.ef_search, k))
+            labels, distances = self.index.knn_query(queries, k=k)
+            return [self._hits(row_labels, 1.0 - row_dist) for row_labels, row_dist in zip(labels, distances)]
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self.index.save_index(os.path.join(path, "hnsw.bin"))
+        self._save_meta(path, m=self.m, ef_construction=self.ef_construction)
+
+    def load(self, path: str):
+        meta = self._load_meta(path)
+        # Graph parameters the index was built with; later upserts keep using them
+        self.m = meta.get("m", self.m)
+        self.ef_construction = meta.get("ef_construction", self.ef_construction)
+        self.index = self._hnswlib.Index(space="cosine", dim=self.dim)
+        self.index.load_index(os.path.join(path, "hnsw.bin"), max_elements=max(len(self.ids), 1))
+        self.index.set_ef(self.ef_search)
+
+
+def create_backend(backend: str, collection_name: str, qdrant_url: str) -> BaseVectorBackend:
+    if backend == "qdrant":
+        return QdrantBackend(collection_name, qdrant_url)
+    if backend == "exact":
+        return ExactBackend()
+    if backend == "exact_int8":
+        return ExactBackend(quantize=True)
+    if backend == "hnsw":
+        return HNSWBackend()
+    raise ValueError(f"Unknown vector backend: {backend}")
@@ -1,48 +1,110 @@
 import json
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Optional, Union
 import pandas as pd
 from sentence_transformers import SentenceTransformer
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import VectorParams, Distance, PointStruct
+
+from .model_registry import get_model
+from .vector_backends import BaseVectorBackend, VectorHit, create_backend
 
 class BaseVectorSearchTool:
+    # Payload key to collapse hits on, so top_k counts distinct entities
+    group_by: Optional[str] = None
+    group_size: int = 1
+
     def __init__(
         self,
         collection_name: str,
         qdrant_url: str = "http://localhost:6333",
         embedding_model: str = "all-MiniLM-L6-v2",
+        backend: Union[str, BaseVectorBackend] = "qdrant",
+        query_backend: str = "torch",
     ):
-        self.model = SentenceTransformer(embedding_model)
-        self.client = QdrantClient(url=qdrant_url)
+        """``backend`` is "qdrant", "exact", "exact_int8", "hnsw" or a
+        BaseVectorBackend instance; the in-process ones need no server.
+        ``query_backend="onnx"`` embeds queries with the int8 ONNX encoder
+        while documents are still indexed with the PyTorch model."""
+        self.embedding_model = embedding_model
+        self.query_backend = query_backend
         self.collection_name = collection_name
-        self._setup_collection()
+        if isinstance(backend, str):
+            backend = create_backend(backend, collection_name, qdrant_url)
+        self.backend = backend
+        self._collection_ready = False
+        # Setup recreates the Qdrant collection; it must run exactly once even
+        # when the first search and the first add arrive on different threads
+        self._setup_lock = threading.Lock()
+
+    @property
+    def model(self) -> SentenceTransformer:
+        # Shared across all tools; loaded on the first encode, not per tool
+        return get_model(self.embedding_model)
+
+    @property
+    def query_model(self):
+        return get_model(self.embedding_model, self.query_backend)
+
+    def reconnect(self):
+        """Re-open backend connections (e.g. in a forked worker)"""
+        self.backend.reconnect()
 
     def _setup_collection(self):
-        if self.client.collection_exists(self.collection_name):
-            self.client.delete_collection(self.collection_name)
-        self.client.create_collection(
-            collection_name=self.collection_name,
-            vectors_config=VectorParams(
-                size=self.model.get_sentence_embedding_dimension(),
-                distance=Distance.COSINE
-            ),
-        )
+        if self._collection_ready:
+            return
+        with self._setup_lock:
+            if self._collection_ready:
+                return
+            self.backend.setup(self.model.get_sentence_embedding_dimension())
+            self._collection_ready = True
+
+    def _upsert(self, ids: List[int], embeddings, payloads: List[dict]):
+        self._setup_collection()
+        self.backend.upsert(ids, embeddings, payloads)
+
+    def save(self, path: str):
+        """Persist an in-process index so it can be loaded (memory-mapped) later"""
+        self.backend.save(path)
+
+    def load(self, path: str):
+        with self._setup_lock:
+            self.backend.load(path)
+            self._collection_ready = True
 
     def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        q_vec = self.model.encode([query])[0].tolist()
-        hits = self.client.search(
-            collection_name=self.collection_name,
-            query_vector=q_vec,
-            limit=top_k
+        return self.search_batch([query], top_k=top_k)[0]
+
+    def search_batch(self, queries: List[str], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Encode all queries in one pass and look them up together"""
+        self._setup_collection()
+        q_vecs = self.query_model.encode(queries)
+        if self.group_by:
+            batches = [self._search_grouped(q, top_k) for q in q_vecs]
+        else:
+            batches = self.backend.search_batch(q_vecs, top_k=top_k)
+        return [self._format_results(hits) for hits in batches]
+
+    def _search_grouped(self, q_vec, top_k: int) -> List[VectorHit]:
+        """One hit per group: its best-scoring point, carrying the payloads
+        of the group's top ``group_size`` points as ``group_hits``"""
+        groups = self.backend.search_groups(
+            q_vec, group_by=self.group_by, top_k=top_k, group_size=self.group_size
         )
-        return self._format_results(hits)
+        return [
+            VectorHit(
+                id=group[0].id,
+                score=group[0].score,
+                payload={**group[0].payload, "group_hits": [h.payload for h in group]}
+            )
+            for group in groups if group
+        ]
 
     def _format_results(self, hits) -> List[Dict[str, Any]]:
         raise NotImplementedError
 
 
 class StructuredVectorSearchTool(BaseVectorSearchTool):
-    def _aggregate_text(self, doc: dict) -> str:
+    @staticmethod
+    def _aggregate_text(doc: dict) -> str:
         parts: List[str] = []
         
         for field in ("bio", "headline"):
@@ -70,20 +132,8 @@ class StructuredVectorSearchTool(BaseVectorSearchTool):
         texts = [self._aggregate_text(d) for d in docs]
         embeddings = self.model.encode(texts, show_progress_bar=True)
 
-        points: List[PointStruct] = []
-        for d, emb in zip(docs, embeddings):
-            rec_id = int(d.get("id", 0))
-            points.append(PointStruct(
-                id=rec_id,
-                vector=emb.tolist(),
-                payload=d
-            ))
-        
-        self.client.upsert(
-            collection_name=self.collection_name,
-            points=points,
-            wait=True
-        )
+        ids = [int(d.get("id", 0)) for d in docs]
+        self._upsert(ids, embeddings, docs)
 
     def _format_results(self, hits) -> List[Dict[str, Any]]:
         results: List[Dict[str, Any]] = []
@@ -101,30 +151,25 @@ class StructuredVectorSearchTool(BaseVectorSearchTool):
 
 
 class AgendaVectorSearchTool(BaseVectorSearchTool):
+    # One point per Q&A answer; collapse so top_k means distinct experts
+    group_by = "expert_id"
+    group_size = 3
+
     def add_documents(self, docs: List[dict]):
         texts = [d["text"] for d in docs]
         embs = self.model.encode(texts, show_progress_bar=True)
-        points: List[PointStruct] = []
-        
-        for d, emb in zip(docs, embs):
-            payload = {
+        payloads = [
+            {
                 "expert_id": d["expert_id"],
                 "expert_name": d["expert_name"],
                 "bio": d["expert_bio"],
                 "headline": d["expert_headline"],
                 "work_summary": d["expert_work_summary"],
+                "text": d["text"],
             }
-            points.append(PointStruct(
-                id=d["_id"],
-                vector=emb.tolist(),
-                payload=payload
-            ))
-        
-        self.client.upsert(
-            collection_name=self.collection_name,
-            points=points,
-            wait=True
-        )
+            for d in docs
+        ]
+        self._upsert([d["_id"] for d in docs], embs, payloads)
 
     def _format_results(self, hits) -> List[Dict[str, Any]]:
         return [
@@ -134,6 +179,9 @@ class AgendaVectorSearchTool(BaseVectorSearchTool):
                 "bio": h.payload["bio"],
                 "headline": h.payload["headline"],
                 "work_summary": h.payload["work_summary"],
+                "matched_answers": [
+                    g.get("text", "") for g in h.payload.get("group_hits", [h.payload])
+                ],
                 "_score": h.score
             }
             for h in hits